@@ -3,19 +3,194 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 Top-level classes and methods.
+
+Submodules are imported when one of the names which they define is first
+accessed, so that importing this package is cheap.
 """
 
-from ._errors import (
-    DbusClientError,
-    DbusClientGenerationError,
-    DbusClientMissingInterfaceError,
-    DbusClientMissingPropertyError,
-    DbusClientMissingSearchPropertiesError,
-    DbusClientRuntimeError,
-    DbusClientSearchConditionError,
-    DbusClientUniqueResultError,
-    DbusClientUnknownSearchPropertiesError,
-)
-from ._managed_objects import managed_object_class
-from ._managed_objects_queries import GMOQuery, mo_query_builder
+from importlib import import_module
+
 from ._version import __version__
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from ._composite import composite_managed_object_class
+    from ._errors import (
+        DbusClientArgumentError,
+        DbusClientBulkUniqueResultError,
+        DbusClientError,
+        DbusClientGenerationError,
+        DbusClientMissingInterfaceError,
+        DbusClientMissingPropertyError,
+        DbusClientMissingSearchPropertiesError,
+        DbusClientOrderingError,
+        DbusClientQueryOptionError,
+        DbusClientReplayOptionError,
+        DbusClientRuntimeError,
+        DbusClientSearchConditionError,
+        DbusClientSnapshotFormatError,
+        DbusClientUniqueResultError,
+        DbusClientUnknownSearchPropertiesError,
+        DbusClientUnknownSignalError,
+        DbusClientValidationError,
+    )
+    from ._managed_objects import ManagedObjectMap, managed_object_class
+    from ._managed_objects_queries import (
+        GMOBulkQuery,
+        GMOBulkResult,
+        GMOQuery,
+        mo_bulk_query_builder,
+        mo_query_builder,
+    )
+    from ._mapped_snapshot import MappedGMOSnapshot, write_mapped_snapshot
+    from ._memory import (
+        GMOSizeReport,
+        class_sizeof,
+        deep_sizeof,
+        gmo_sizeof,
+        traced_allocation,
+    )
+    from ._methods import method_proxy_class
+    from ._properties import PropertyFetcher, property_fetcher_class
+    from ._query_plan import QueryPlan
+    from ._replay import GMORecorder, OperationLatency, ReplayReport, replay
+    from ._signals import SignalDispatcher, SignalMessage, signal_dispatcher
+    from ._snapshot import GMOSnapshot
+    from ._snapshot_holder import GMOSnapshotHolder, PublishedGMOSnapshot
+    from ._spec import InterfaceSpec, PropertySpec, parse_interface_specs
+    from ._spec_cache import SpecCache
+    from ._transport import MethodCall, PendingReply, Transport
+    from ._validation import GMOValidationReport, ValidatedGMO, validate_gmo
+
+_SUBMODULES = {
+    "_composite": ("composite_managed_object_class",),
+    "_errors": (
+        "DbusClientArgumentError",
+        "DbusClientBulkUniqueResultError",
+        "DbusClientError",
+        "DbusClientGenerationError",
+        "DbusClientMissingInterfaceError",
+        "DbusClientMissingPropertyError",
+        "DbusClientMissingSearchPropertiesError",
+        "DbusClientOrderingError",
+        "DbusClientQueryOptionError",
+        "DbusClientReplayOptionError",
+        "DbusClientRuntimeError",
+        "DbusClientSearchConditionError",
+        "DbusClientSnapshotFormatError",
+        "DbusClientUniqueResultError",
+        "DbusClientUnknownSearchPropertiesError",
+        "DbusClientUnknownSignalError",
+        "DbusClientValidationError",
+    ),
+    "_managed_objects": ("ManagedObjectMap", "managed_object_class"),
+    "_managed_objects_queries": (
+        "GMOBulkQuery",
+        "GMOBulkResult",
+        "GMOQuery",
+        "mo_bulk_query_builder",
+        "mo_query_builder",
+    ),
+    "_mapped_snapshot": ("MappedGMOSnapshot", "write_mapped_snapshot"),
+    "_memory": (
+        "GMOSizeReport",
+        "class_sizeof",
+        "deep_sizeof",
+        "gmo_sizeof",
+        "traced_allocation",
+    ),
+    "_methods": ("method_proxy_class",),
+    "_properties": ("PropertyFetcher", "property_fetcher_class"),
+    "_query_plan": ("QueryPlan",),
+    "_replay": ("GMORecorder", "OperationLatency", "ReplayReport", "replay"),
+    "_signals": ("SignalDispatcher", "SignalMessage", "signal_dispatcher"),
+    "_snapshot": ("GMOSnapshot",),
+    "_snapshot_holder": ("GMOSnapshotHolder", "PublishedGMOSnapshot"),
+    "_spec": ("InterfaceSpec", "PropertySpec", "parse_interface_specs"),
+    "_spec_cache": ("SpecCache",),
+    "_transport": ("MethodCall", "PendingReply", "Transport"),
+    "_validation": ("GMOValidationReport", "ValidatedGMO", "validate_gmo"),
+}
+
+_LOCATIONS = {name: module for (module, names) in _SUBMODULES.items() for name in names}
+
+__all__ = [
+    "DbusClientArgumentError",
+    "DbusClientBulkUniqueResultError",
+    "DbusClientError",
+    "DbusClientGenerationError",
+    "DbusClientMissingInterfaceError",
+    "DbusClientMissingPropertyError",
+    "DbusClientMissingSearchPropertiesError",
+    "DbusClientOrderingError",
+    "DbusClientQueryOptionError",
+    "DbusClientReplayOptionError",
+    "DbusClientRuntimeError",
+    "DbusClientSearchConditionError",
+    "DbusClientSnapshotFormatError",
+    "DbusClientUniqueResultError",
+    "DbusClientUnknownSearchPropertiesError",
+    "DbusClientUnknownSignalError",
+    "DbusClientValidationError",
+    "GMOBulkQuery",
+    "GMOBulkResult",
+    "GMOQuery",
+    "GMORecorder",
+    "GMOSizeReport",
+    "GMOSnapshot",
+    "GMOSnapshotHolder",
+    "GMOValidationReport",
+    "InterfaceSpec",
+    "ManagedObjectMap",
+    "MappedGMOSnapshot",
+    "MethodCall",
+    "OperationLatency",
+    "PendingReply",
+    "PropertyFetcher",
+    "PropertySpec",
+    "PublishedGMOSnapshot",
+    "QueryPlan",
+    "ReplayReport",
+    "SignalDispatcher",
+    "SignalMessage",
+    "SpecCache",
+    "Transport",
+    "ValidatedGMO",
+    "__version__",
+    "class_sizeof",
+    "composite_managed_object_class",
+    "deep_sizeof",
+    "gmo_sizeof",
+    "managed_object_class",
+    "method_proxy_class",
+    "mo_bulk_query_builder",
+    "mo_query_builder",
+    "parse_interface_specs",
+    "property_fetcher_class",
+    "replay",
+    "signal_dispatcher",
+    "traced_allocation",
+    "validate_gmo",
+    "write_mapped_snapshot",
+]
+
+
+def __getattr__(name):
+    """
+    Import the submodule which defines name, and cache the value.
+
+    :param str name: the name of the attribute
+    :raises AttributeError: if name is not exported by this package
+    """
+    try:
+        module = _LOCATIONS[name]
+    except KeyError as err:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from err
+
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LOCATIONS})
@@ -0,0 +1,187 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for generating classes which wrap the tables of several interfaces of
+one object returned by GetManagedObjects().
+"""
+
+import types
+from typing import Callable, Dict, Iterable, Mapping, Optional, Union
+from xml.etree.ElementTree import Element
+
+from ._errors import (
+    DbusClientGenerationError,
+    DbusClientMissingInterfaceError,
+    DbusClientMissingPropertyError,
+)
+from ._managed_objects_queries import _interface_properties
+from ._spec import InterfaceSpec
+
+
+def composite_managed_object_builder(
+    specs: Iterable[Union[Element, InterfaceSpec]],
+    *,
+    required: Optional[Iterable[str]] = None,
+    prefixes: Optional[Mapping[str, str]] = None,
+) -> Callable:
+    """
+    Returns a function that builds a method interface based on several
+    interface specifications. The class has a property getter for every
+    property of every interface, and its initializer looks up the table of
+    each interface once.
+
+    By default, the getters of all interfaces share one namespace, and a
+    property name which belongs to more than one interface is an error. An
+    interface may be given a prefix, which is prepended to the names of the
+    getters of its properties.
+
+    Usage example:
+
+    >>> builder = composite_managed_object_builder(
+    ...     [pool_spec, pool_r1_spec], prefixes={"org.storage.Pool.r1": "r1_"}
+    ... )
+    >>> Pool = types.new_class("Pool", bases=(object,), exec_body=builder)
+    >>> pool = Pool(data)
+    >>> (pool.Name(), pool.r1_Uuid())
+
+    :param specs: the interface specifications
+    :type specs: iterable of Element or InterfaceSpec
+    :param required: the names of the interfaces which every object must
+        implement, by default all of them
+    :type required: iterable of str or NoneType
+    :param prefixes: map from interface name to getter name prefix
+    :type prefixes: Mapping of str * str or NoneType
+    :raises DbusClientGenerationError:
+    """
+    interfaces = [_interface_properties(spec) for spec in specs]
+    interface_names = [interface_name for (interface_name, _) in interfaces]
+
+    required = frozenset(interface_names if required is None else required)
+    prefixes = {} if prefixes is None else prefixes
+
+    unknown = required.union(prefixes).difference(interface_names)
+    if unknown:
+        raise DbusClientGenerationError(
+            "Interfaces %s were not among those specified: %s"
+            % (", ".join(sorted(unknown)), ", ".join(interface_names))
+        )
+
+    # Map each getter name to the position and name of the interface, and
+    # the name of the property.
+    getters: Dict[str, tuple] = {}
+    for position, (interface_name, property_names) in enumerate(interfaces):
+        prefix = prefixes.get(interface_name, "")
+        for name in sorted(property_names):
+            getter_name = prefix + name
+            if getter_name in getters:
+                fmt_str = (
+                    'Property getter "%s" of interface "%s" conflicts with '
+                    'that of interface "%s"'
+                )
+                raise DbusClientGenerationError(
+                    fmt_str % (getter_name, interface_name, getters[getter_name][1])
+                )
+            getters[getter_name] = (position, interface_name, name)
+
+    def build_property(position, interface_name, name):
+        """
+        Build a single property getter for this class.
+
+        :param int position: the position of the interface's table
+        :param str interface_name: the interface name
+        :param str name: the property name
+
+        :returns: the value of the property
+        :rtype: object
+        """
+
+        def dbus_func(self):
+            """
+            The property getter.
+
+            :raises: DbusClientMissingInterfaceError
+            :raises: DbusClientMissingPropertyError
+            """
+            table = self._tables[position]
+            if table is None:
+                fmt_str = 'No data in table for interface "%s" found'
+                raise DbusClientMissingInterfaceError(
+                    fmt_str % interface_name, interface_name
+                )
+            try:
+                return table[name]
+            except KeyError as err:
+                fmt_str = 'No entry found for interface "%s" and property "%s"'
+                raise DbusClientMissingPropertyError(
+                    fmt_str % (interface_name, name), interface_name, name
+                ) from err
+
+        return dbus_func
+
+    def builder(namespace):
+        """
+        The property class's namespace.
+
+        :param namespace: the class's namespace
+        """
+        for getter_name, (position, interface_name, name) in getters.items():
+            namespace[getter_name] = build_property(position, interface_name, name)
+
+        def __init__(self, table):
+            """
+            The initializer for this class.
+
+            :raises: DbusClientMissingInterfaceError
+            """
+            self._tables = tuple(table.get(name) for name in interface_names)
+            for interface_name, sub_table in zip(interface_names, self._tables):
+                if sub_table is None and interface_name in required:
+                    fmt_str = 'No data in table for interface "%s" found'
+                    raise DbusClientMissingInterfaceError(
+                        fmt_str % interface_name, interface_name
+                    )
+
+        namespace["__init__"] = __init__
+
+    return builder
+
+
+def composite_managed_object_class(
+    name: str,
+    specs: Iterable[Union[Element, InterfaceSpec]],
+    *,
+    required: Optional[Iterable[str]] = None,
+    prefixes: Optional[Mapping[str, str]] = None,
+):
+    """
+    Returns a class like that returned by managed_object_class, but which
+    wraps the tables of several interfaces of one object. Its initializer
+    takes the data of an object, which maps each interface to its table.
+
+    Usage example:
+
+    >>> Pool = composite_managed_object_class(
+    ...     "Pool", [pool_spec, pool_r1_spec], required=["org.storage.Pool"]
+    ... )
+    >>> pool = Pool(data)
+    >>> (pool.Name(), pool.Uuid())
+
+    :param str name: the name to give the auto-generated class
+    :param specs: the interface specifications
+    :type specs: iterable of Element or InterfaceSpec
+    :param required: the names of the interfaces which every object must
+        implement, by default all of them
+    :type required: iterable of str or NoneType
+    :param prefixes: map from interface name to getter name prefix
+    :type prefixes: Mapping of str * str or NoneType
+    :rtype: type
+    :raises DbusClientGenerationError:
+    """
+    return types.new_class(
+        name,
+        bases=(object,),
+        exec_body=composite_managed_object_builder(
+            specs, required=required, prefixes=prefixes
+        ),
+    )
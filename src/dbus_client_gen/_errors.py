@@ -5,6 +5,23 @@
 Exception hierarchy for this package.
 """
 
+from typing import Any, Optional, Sequence, Tuple
+
+
+def _limit_items(
+    items: Sequence[Any], limit: Optional[int]
+) -> Tuple[Sequence[Any], str]:
+    """
+    Select the items to show in an error message.
+
+    :param items: the items
+    :param limit: the most items to show, or None for all
+    :returns: the items to show, and a note of how many were left out
+    """
+    if limit is None or len(items) <= limit:
+        return (items, "")
+    return (items[:limit], " (and %d more)" % (len(items) - limit))
+
 
 class DbusClientError(Exception):
     """
@@ -18,6 +35,32 @@ class DbusClientGenerationError(DbusClientError):
     """
 
 
+class _FormattedMessage(Exception):
+    """
+    Mixin for an exception whose message may be given as None, in which case
+    it is formatted from the fields of the exception by _format_message when
+    args is first read, so that an exception which is caught without being
+    displayed does not pay for formatting it. Once formatted, the message is
+    an ordinary str in args. Every class which mixes this in must define
+    _format_message.
+    """
+
+    def _format_message(self) -> str: ...
+
+    def __getattribute__(self, name: str) -> Any:
+        value = super().__getattribute__(name)
+        if name == "args" and value and value[0] is None:
+            value = (self._format_message(),) + value[1:]
+            self.args = value
+        return value
+
+    def __str__(self) -> str:
+        return str(self.args[0])
+
+    def __repr__(self) -> str:
+        return "%s(%r)" % (type(self).__name__, self.args[0])
+
+
 class DbusClientRuntimeError(DbusClientError):
     """
     Exception raised during execution of generated classes.
@@ -34,7 +77,7 @@ class DbusClientRuntimeError(DbusClientError):
         self.interface_name = interface_name
 
 
-class DbusClientMissingSearchPropertiesError(DbusClientRuntimeError):
+class DbusClientMissingSearchPropertiesError(_FormattedMessage, DbusClientRuntimeError):
     """
     Exception returned when searching GMO result finds expected properties
     missing.
@@ -44,7 +87,8 @@ class DbusClientMissingSearchPropertiesError(DbusClientRuntimeError):
         """
         Initialize exception.
 
-        :param str message: the error message
+        :param message: the error message, or None to format it when rendered
+        :type message: str or NoneType
         :param str interface_name: the interface name
         :param query_keys: names of properties used in query
         :type query_keys: list of str
@@ -52,8 +96,17 @@ class DbusClientMissingSearchPropertiesError(DbusClientRuntimeError):
         :type data_keys: list of str
         """
         super().__init__(message, interface_name)
-        self.query_keys = query_keys
-        self.data_keys = data_keys
+        self.query_keys = list(query_keys)
+        self.data_keys = list(data_keys)
+
+    def _format_message(self) -> str:
+        fmt_str = 'Missing properties in data for some object in interface "%s": %s'
+        return fmt_str % (
+            self.interface_name,
+            ", ".join(
+                str(x) for x in frozenset(self.query_keys) - frozenset(self.data_keys)
+            ),
+        )
 
 
 class DbusClientUnknownSearchPropertiesError(DbusClientRuntimeError):
@@ -114,32 +167,232 @@ class DbusClientSearchConditionError(DbusClientRuntimeError):
     """
     Exception raised when the search result does not match specified
     requirements.
+
+    The message of such an exception lists the objects or values found. If
+    max_reported_results is not None, at most that many are listed.
     """
 
-    def __init__(self, message, interface_name):
+    def __init__(self, message, interface_name, *, max_reported_results=None):
         """
         Initialize exception.
 
         :param str message: the error message
         :param str interface_name: the interface name
+        :param max_reported_results: the most results to list in the message
+        :type max_reported_results: int or NoneType
         """
         super().__init__(message, interface_name)
+        self.max_reported_results = max_reported_results
 
 
-class DbusClientUniqueResultError(DbusClientSearchConditionError):
+class DbusClientUniqueResultError(_FormattedMessage, DbusClientSearchConditionError):
     """
     Exception raised when the search result does not yield a unique item.
     """
 
-    def __init__(self, message, interface_name, props, result):
+    def __init__(
+        self, message, interface_name, props, result, *, max_reported_results=None
+    ):
         """
         Initialize exception.
 
-        :param str message: the error message
+        :param message: the error message, or None to format it when rendered
+        :type message: str or NoneType
         :param str interface_name: the interface name
         :param dict props: the list of properties for this interface to match
         :param list result: the list of objects found via the search string
+        :param max_reported_results: the most results to list in the message
+        :type max_reported_results: int or NoneType
+        """
+        super().__init__(
+            message, interface_name, max_reported_results=max_reported_results
+        )
+        self.props = dict(props)
+        self.result = list(result)
+
+    def _format_message(self) -> str:
+        (shown, more) = _limit_items(self.result, self.max_reported_results)
+        return (
+            f"No unique match found for interface "
+            f"{self.interface_name} and properties {self.props}, "
+            f"found {shown}{more}"
+        )
+
+
+class DbusClientQueryOptionError(DbusClientRuntimeError):
+    """
+    Exception raised when a query option is given an invalid value.
+    """
+
+    def __init__(self, message, interface_name, option_name, value):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param str interface_name: the interface name
+        :param str option_name: the name of the option
+        :param object value: the invalid value
+        """
+        super().__init__(message, interface_name)
+        self.option_name = option_name
+        self.value = value
+
+
+class DbusClientOrderingError(DbusClientRuntimeError):
+    """
+    Exception raised when the matches of a search can not be ordered,
+    because the values of the properties they are ordered by can not be
+    compared with each other.
+    """
+
+    def __init__(self, message, interface_name, property_names):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param str interface_name: the interface name
+        :param property_names: the names of the properties ordered by
+        :type property_names: list of str
+        """
+        super().__init__(message, interface_name)
+        self.property_names = property_names
+
+
+class DbusClientArgumentError(DbusClientRuntimeError):
+    """
+    Exception raised when the arguments supplied for a method or carried by
+    a signal do not match those in the interface specification.
+    """
+
+    def __init__(self, message, interface_name, member_name, arg_names):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param str interface_name: the interface name
+        :param str member_name: the name of the method or signal
+        :param arg_names: the argument names in the specification
+        :type arg_names: list of str or NoneType
+        """
+        super().__init__(message, interface_name)
+        self.member_name = member_name
+        self.arg_names = arg_names
+
+
+class DbusClientUnknownSignalError(DbusClientRuntimeError):
+    """
+    Exception raised when a handler is connected to a signal which is not
+    found in the given interface.
+    """
+
+    def __init__(self, message, interface_name, member_name):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param str interface_name: the interface name
+        :param str member_name: the name of the signal
         """
         super().__init__(message, interface_name)
-        self.props = props
-        self.result = result
+        self.member_name = member_name
+
+
+class DbusClientValidationError(DbusClientError):
+    """
+    Exception raised when GMO data does not conform to a set of interface
+    specifications.
+    """
+
+    def __init__(self, message, report):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param GMOValidationReport report: every missing interface and property
+        """
+        super().__init__(message)
+        self.report = report
+
+
+class DbusClientBulkUniqueResultError(
+    _FormattedMessage, DbusClientSearchConditionError
+):
+    """
+    Exception raised when a bulk search finds more than one item for some
+    of the values searched for.
+    """
+
+    def __init__(
+        self,
+        message,
+        interface_name,
+        property_name,
+        results,
+        *,
+        max_reported_results=None,
+    ):
+        """
+        Initialize exception.
+
+        :param message: the error message, or None to format it when rendered
+        :type message: str or NoneType
+        :param str interface_name: the interface name
+        :param str property_name: the property whose values were searched for
+        :param dict results: map from each value which matched more than one
+            object to the list of objects it matched
+        :param max_reported_results: the most values to list in the message
+        :type max_reported_results: int or NoneType
+        """
+        super().__init__(
+            message, interface_name, max_reported_results=max_reported_results
+        )
+        self.property_name = property_name
+        self.results = {value: list(found) for (value, found) in results.items()}
+
+    def _format_message(self) -> str:
+        (shown, more) = _limit_items(list(self.results), self.max_reported_results)
+        fmt_str = (
+            'No unique match found for interface "%s" and property "%s" '
+            "for values: %s%s"
+        )
+        return fmt_str % (
+            self.interface_name,
+            self.property_name,
+            ", ".join(repr(value) for value in shown),
+            more,
+        )
+
+
+class DbusClientReplayOptionError(DbusClientError):
+    """
+    Exception raised when a replay is given an invalid option value.
+    """
+
+    def __init__(self, message, option_name, value):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param str option_name: the name of the option
+        :param object value: the invalid value
+        """
+        super().__init__(message)
+        self.option_name = option_name
+        self.value = value
+
+
+class DbusClientSnapshotFormatError(DbusClientError):
+    """
+    Exception raised when a GMO snapshot can not be written to or read from
+    its on-disk format.
+    """
+
+    def __init__(self, message, file_path):
+        """
+        Initialize exception.
+
+        :param str message: the error message
+        :param str file_path: the path of the snapshot file
+        """
+        super().__init__(message)
+        self.file_path = file_path
@@ -7,17 +7,18 @@ returned by GetManagedObjects().
 """
 
 import types
-from typing import Callable
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, Mapping, Tuple, Union
 from xml.etree.ElementTree import Element
 
-from ._errors import (
-    DbusClientGenerationError,
-    DbusClientMissingInterfaceError,
-    DbusClientMissingPropertyError,
-)
+from ._errors import DbusClientMissingInterfaceError, DbusClientMissingPropertyError
+from ._snapshot import GMOSnapshot
+from ._spec import InterfaceSpec, _property_names
 
 
-def managed_object_builder(spec: Element) -> Callable:
+def managed_object_builder(
+    spec: Union[Element, InterfaceSpec], *, checked: bool = True
+) -> Callable:
     """
     Returns a function that builds a method interface based on 'spec'.
     This method interface is a simple one to return the values of
@@ -36,16 +37,16 @@ def managed_object_builder(spec: Element) -> Callable:
     >>> fs = Filesystem(table)
     >>> fs.Pool()
 
+    If checked is False, the property getters do not check that the property
+    is present in the table. Such a class must only be constructed from data
+    which is known to contain every property of the interface.
+
     :param spec: the interface specification
-    :type spec: Element
+    :type spec: Element or InterfaceSpec
+    :param bool checked: whether property getters check for missing entries
     """
 
-    try:
-        interface_name = spec.attrib["name"]
-    except KeyError as err:
-        raise DbusClientGenerationError(
-            "No name attribute found for interface."
-        ) from err
+    (interface_name, property_names) = _property_names(spec)
 
     def build_property(name):
         """
@@ -71,7 +72,13 @@ def managed_object_builder(spec: Element) -> Callable:
                     fmt_str % (interface_name, name), interface_name, name
                 ) from err
 
-        return dbus_func
+        def unchecked_dbus_func(self):
+            """
+            The property getter, for validated data.
+            """
+            return self._table[name]
+
+        return dbus_func if checked else unchecked_dbus_func
 
     def builder(namespace):
         """
@@ -79,18 +86,7 @@ def managed_object_builder(spec: Element) -> Callable:
 
         :param namespace: the class's namespace
         """
-        for prop in spec.findall("./property"):
-            try:
-                name = prop.attrib["name"]
-            # Currently tests are only run on well-formed specs generated by
-            # Hypothesis, this branch is not covered.
-            except KeyError as err:  # pragma: no cover
-                fmt_str = (
-                    "No name attribute found for some property "
-                    'belonging to interface "%s"'
-                )
-                raise DbusClientGenerationError(fmt_str % interface_name) from err
-
+        for name in property_names:
             namespace[name] = build_property(name)
 
         def __init__(self, table):
@@ -112,7 +108,7 @@ def managed_object_builder(spec: Element) -> Callable:
     return builder
 
 
-def managed_object_class(name: str, spec: Element):
+def managed_object_class(name: str, spec: Union[Element, InterfaceSpec]):
     """
     Returns a class with an __init__ function which takes one
     argument, a table which is a portion of the tree returned by
@@ -138,3 +134,106 @@ def managed_object_class(name: str, spec: Element):
     return types.new_class(
         name, bases=(object,), exec_body=managed_object_builder(spec)
     )
+
+
+class ManagedObjectMap(Mapping[Any, Any]):
+    """
+    A lazy map from the path of every object in a GetManagedObjects() result
+    which implements an interface to an instance of a class, such as one
+    returned by managed_object_class, which wraps that object's data.
+
+    Objects are selected by checking that the interface is in their data,
+    which allocates nothing; if the result is a GMOSnapshot its index is
+    used instead. An instance is constructed only when it is first looked
+    up, and is then kept for as long as the map is.
+
+    The result must not be modified while the map is in use. When a new
+    result is obtained, updated() returns a map over it which reuses the
+    instances of every object whose data is the same object as before.
+    """
+
+    def __init__(
+        self,
+        klass: Callable[[Mapping[str, Mapping[str, Any]]], Any],
+        interface_name: str,
+        gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]],
+    ):
+        """
+        Initializer.
+
+        Usage example:
+
+        >>> Pool = managed_object_class("Pool", spec)
+        >>> pools = ManagedObjectMap(Pool, "org.storage.Pool", gmo_result)
+        >>> pools["/org/storage/pool/1"].Name()
+
+        :param klass: the class, which is constructed from the data of one
+            object
+        :param str interface_name: the interface which objects must implement
+        :param gmo_result: the GetManagedObjects() result
+        """
+        self._klass = klass
+        self._interface_name = interface_name
+        self._gmo_result = gmo_result
+        self._instances: Dict[Any, Tuple[Mapping, Any]] = {}
+        self._previous: Mapping[Any, Tuple[Mapping, Any]] = {}
+
+    def __getitem__(self, object_path: Any) -> Any:
+        entry = self._instances.get(object_path)
+        if entry is not None:
+            return entry[1]
+
+        data = self._gmo_result[object_path]
+        if self._interface_name not in data:
+            raise KeyError(object_path)
+
+        entry = self._previous.get(object_path)
+        if entry is None or entry[0] is not data:
+            entry = (data, self._klass(data))
+        self._instances[object_path] = entry
+        return entry[1]
+
+    def __contains__(self, object_path: object) -> bool:
+        data = self._gmo_result.get(object_path)
+        return data is not None and self._interface_name in data
+
+    def __iter__(self) -> Iterator[Any]:
+        if isinstance(self._gmo_result, GMOSnapshot):
+            return (
+                object_path
+                for (object_path, _) in self._gmo_result.objects_with_interface(
+                    self._interface_name
+                )
+            )
+        return (
+            object_path
+            for (object_path, data) in self._gmo_result.items()
+            if self._interface_name in data
+        )
+
+    def __len__(self) -> int:
+        if isinstance(self._gmo_result, GMOSnapshot):
+            return len(self._gmo_result.objects_with_interface(self._interface_name))
+        return sum(1 for _ in self)
+
+    def updated(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> "ManagedObjectMap":
+        """
+        Returns a map over a new GetManagedObjects() result. Instances which
+        this map has constructed, or could have reused from the map it was
+        updated from, are reused for objects whose data in the new result is
+        the same object as before.
+
+        :param gmo_result: the new GetManagedObjects() result
+        :rtype: ManagedObjectMap
+        """
+        result = ManagedObjectMap(self._klass, self._interface_name, gmo_result)
+        result._previous = {
+            object_path: entry
+            for (object_path, entry) in chain(
+                self._previous.items(), self._instances.items()
+            )
+            if gmo_result.get(object_path) is entry[0]
+        }
+        return result
@@ -6,15 +6,48 @@ Code for generating methods suitable for identifying objects in
 the data structure returned by the GetManagedObjects() method.
 """
 
-import xml.etree.ElementTree as ET
-from typing import Any, Callable, Generator, Mapping, Optional, Tuple
+import heapq
+import itertools
+import math
+import operator
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from ._errors import (
-    DbusClientGenerationError,
+    DbusClientBulkUniqueResultError,
     DbusClientMissingSearchPropertiesError,
+    DbusClientOrderingError,
+    DbusClientQueryOptionError,
     DbusClientUniqueResultError,
     DbusClientUnknownSearchPropertiesError,
 )
+from ._query_plan import (
+    _FULL_SCAN,
+    _INDEX_PROBE,
+    _MISSING,
+    _SAMPLE_SIZE,
+    QueryPlan,
+    _comparison_cost,
+    _order_comparisons,
+)
+from ._snapshot import GMOSnapshot
+from ._spec import InterfaceSpec, _property_names
+
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as ET
 
 
 class GMOQuery:
@@ -23,15 +56,56 @@ class GMOQuery:
     call.
     """
 
-    def __init__(self, interface_name: str, props: Mapping[str, Any]):
+    def __init__(
+        self,
+        interface_name: str,
+        props: Mapping[str, Any],
+        *,
+        checked: bool = True,
+        property_names: Optional[FrozenSet[str]] = None,
+    ):
         """
-        Initialize the query with its function, which is run on a single
-        entry in the GetManagedObjects result. The function is generated from
-        interface_name and props.
+        Initialize the query. The function which is run on each entry in the
+        GetManagedObjects result is generated from interface_name and props
+        when the query is run.
+
+        If checked is False, the function does not check that the properties
+        are present in each entry, and must only be run on data which is known
+        to contain every property in props for this interface.
 
         :param str interface_name: the particular interface
         :param dict props: properties of the interface on which to match
+        :param bool checked: whether to check for missing properties
+        :param property_names: the properties of the interface, if known
+        :type property_names: frozenset of str or NoneType
         """
+        self._interface_name = interface_name
+        self._props = props
+        # The comparisons ordered by cost alone, which is the order used
+        # when there is no sample from which to estimate their selectivity.
+        self._comparisons = tuple(
+            sorted(props.items(), key=lambda item: _comparison_cost(item[1]))
+        )
+        self._checked = checked
+        self._property_names = property_names
+        self._require_unique = False
+        self._max_reported_results: Optional[int] = None
+        self._order: Optional[Tuple[Tuple[str, ...], bool]] = None
+        self._offset = 0
+        self._limit: Optional[int] = None
+
+    def _filter_func(
+        self, comparisons: Tuple[Tuple[str, Any], ...]
+    ) -> Callable[[Mapping[str, Mapping[str, Any]]], bool]:
+        """
+        Returns the function which is run on a single entry in the
+        GetManagedObjects result, and which makes the comparisons in the
+        order given.
+
+        :param comparisons: pairs of property name and value
+        """
+        interface_name = self._interface_name
+        props = self._props
 
         def filter_func(data: Mapping[str, Mapping[str, Any]]) -> bool:
             """
@@ -46,95 +120,616 @@ class GMOQuery:
             sub_table = data[interface_name]
 
             try:
-                return all(sub_table[key] == value for (key, value) in props.items())
+                return all(sub_table[key] == value for (key, value) in comparisons)
             except KeyError as err:
-                fmt_str = (
-                    'Missing properties in data for some object in interface "%s": %s'
-                )
-                missing = ", ".join(
-                    str(x)
-                    for x in frozenset(props.keys()) - frozenset(sub_table.keys())
-                )
                 raise DbusClientMissingSearchPropertiesError(
-                    fmt_str % (interface_name, missing),
-                    interface_name,
-                    list(props.keys()),
-                    list(sub_table.keys()),
+                    None, interface_name, list(props.keys()), list(sub_table.keys())
                 ) from err
 
-        self._interface_name = interface_name
-        self._props = props
-        self._filter_func = filter_func
-        self._require_unique = False
+        def unchecked_filter_func(data: Mapping[str, Mapping[str, Any]]) -> bool:
+            """
+            Returns true if an item should be kept, false otherwise.
+
+            :returns: true for acceptance, false for rejection
+            :rtype: bool
+            """
+            if interface_name not in data:
+                return False
+            sub_table = data[interface_name]
+            return all(sub_table[key] == value for (key, value) in comparisons)
+
+        return filter_func if self._checked else unchecked_filter_func
+
+    def _planned_filter_func(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> Callable[[Mapping[str, Mapping[str, Any]]], bool]:
+        """
+        Returns the function which is run on each entry of a
+        GetManagedObjects() result, making the comparisons in the order
+        chosen from a sample of its candidates.
+        """
+        comparisons = self._comparisons
+        if len(comparisons) > 1:
+            comparisons = _order_comparisons(
+                comparisons,
+                self._sample_tables(self._sample(self._candidates(gmo_result))),
+            )
+        return self._filter_func(comparisons)
+
+    @staticmethod
+    def _sample(
+        candidates: Iterable[Tuple[Any, Mapping[str, Mapping[str, Any]]]],
+    ) -> List[Tuple[Any, Mapping[str, Mapping[str, Any]]]]:
+        """
+        The first few candidates, from which the selectivity of the
+        comparisons is estimated.
+        """
+        return list(itertools.islice(candidates, _SAMPLE_SIZE))
 
-    def require_unique_match(self, value: Optional[bool] = True):
+    def _sample_tables(
+        self, sample: Iterable[Tuple[Any, Mapping[str, Mapping[str, Any]]]]
+    ) -> List[Mapping[str, Any]]:
+        """
+        The tables for this interface of the sampled objects which
+        implement it.
+        """
+        interface_name = self._interface_name
+        return [data[interface_name] for (_, data) in sample if interface_name in data]
+
+    def require_unique_match(
+        self,
+        value: Optional[bool] = True,
+        *,
+        max_reported_results: Optional[int] = None,
+    ):
         """
         If value is True, or no value is specified, the search requires
         the result to be unique, i.e. there must be exactly one match.
+
+        :param max_reported_results: the most matches to list in the message
+            of the error raised if the result is not unique, or None for all
+        :type max_reported_results: int or NoneType
         """
         self._require_unique = value
+        self._max_reported_results = max_reported_results
+        return self
+
+    def order_by(self, *names: str, descending: bool = False):
+        """
+        Order the matches by the values of the named properties, compared in
+        the order given. If no names are given, the matches are not ordered.
+
+        :param names: the property names
+        :param bool descending: whether to put the largest values first
+        :raises DbusClientUnknownSearchPropertiesError:
+        """
+        if self._property_names is not None:
+            _check_properties(self._interface_name, names, self._property_names)
+        self._order = (names, descending) if names else None
         return self
 
+    def offset(self, value: int):
+        """
+        Skip the first value matches.
+
+        :param int value: a non-negative number of matches to skip
+        :raises DbusClientQueryOptionError:
+        """
+        self._offset = self._count_option("offset", value)
+        return self
+
+    def limit(self, value: Optional[int]):
+        """
+        Generate at most value matches. If value is None, do not limit the
+        number of matches.
+
+        :param value: a non-negative number of matches, or None
+        :type value: int or NoneType
+        :raises DbusClientQueryOptionError:
+        """
+        self._limit = None if value is None else self._count_option("limit", value)
+        return self
+
+    def _count_option(self, option_name: str, value: Any) -> int:
+        """
+        Check that the value of an option is a non-negative int.
+
+        :raises DbusClientQueryOptionError:
+        """
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            fmt_str = 'Value of option "%s" must be a non-negative int, not %r'
+            raise DbusClientQueryOptionError(
+                fmt_str % (option_name, value), self._interface_name, option_name, value
+            )
+        return value
+
+    def count(self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]) -> int:
+        """
+        Count the matches in a GetManagedObjects() result. Ordering, offset,
+        limit and the unique match requirement are disregarded.
+
+        :raises DbusClientMissingSearchPropertiesError:
+
+        :returns: the number of matches
+        :rtype: int
+        """
+        return sum(
+            map(
+                self._planned_filter_func(gmo_result),
+                self._candidate_tables(gmo_result),
+            )
+        )
+
+    def exists(self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]) -> bool:
+        """
+        Determine whether a GetManagedObjects() result contains any match,
+        stopping at the first match. Ordering, offset, limit and the unique
+        match requirement are disregarded.
+
+        :raises DbusClientMissingSearchPropertiesError:
+
+        :returns: True if there is a match
+        :rtype: bool
+        """
+        return any(
+            map(
+                self._planned_filter_func(gmo_result),
+                self._candidate_tables(gmo_result),
+            )
+        )
+
+    def count_by(
+        self, name: str, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> Dict[Any, int]:
+        """
+        Count the matches in a GetManagedObjects() result for each value of
+        a property, which must be hashable. Ordering, offset, limit and the
+        unique match requirement are disregarded.
+
+        :param str name: the property name
+        :raises DbusClientUnknownSearchPropertiesError:
+        :raises DbusClientMissingSearchPropertiesError:
+
+        :returns: map from each value of the property to its number of matches
+        :rtype: dict
+        """
+        interface_name = self._interface_name
+        if self._property_names is not None:
+            _check_properties(interface_name, [name], self._property_names)
+
+        counts: Dict[Any, int] = {}
+        for data in filter(
+            self._planned_filter_func(gmo_result), self._candidate_tables(gmo_result)
+        ):
+            sub_table = data[interface_name]
+            try:
+                value = sub_table[name]
+            except KeyError as err:
+                raise DbusClientMissingSearchPropertiesError(
+                    None, interface_name, [name], list(sub_table.keys())
+                ) from err
+            counts[value] = counts.get(value, 0) + 1
+
+        return counts
+
+    def _candidates(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> Collection[Tuple[Any, Mapping[str, Mapping[str, Any]]]]:
+        """
+        The entries of a GetManagedObjects() result which may match. If the
+        result is a GMOSnapshot, only the objects which implement the
+        interface are visited.
+        """
+        if isinstance(gmo_result, GMOSnapshot):
+            return gmo_result.objects_with_interface(self._interface_name)
+        return gmo_result.items()
+
+    def _candidate_tables(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> Iterable[Mapping[str, Mapping[str, Any]]]:
+        """
+        The data of the entries of a GetManagedObjects() result which may
+        match.
+        """
+        if isinstance(gmo_result, GMOSnapshot):
+            return map(
+                operator.itemgetter(1),
+                gmo_result.objects_with_interface(self._interface_name),
+            )
+        return gmo_result.values()
+
+    def _sort_key(
+        self, names: Tuple[str, ...]
+    ) -> Callable[[Tuple[Any, Mapping[str, Mapping[str, Any]]]], Tuple[Any, ...]]:
+        """
+        Returns a function which computes the sort key of a match.
+
+        :param names: the names of the properties to order by
+        """
+        interface_name = self._interface_name
+
+        def key(item: Tuple[Any, Mapping[str, Mapping[str, Any]]]) -> Tuple[Any, ...]:
+            """
+            The sort key.
+
+            :raises DbusClientMissingSearchPropertiesError:
+            """
+            sub_table = item[1][interface_name]
+            try:
+                return tuple(sub_table[name] for name in names)
+            except KeyError as err:
+                raise DbusClientMissingSearchPropertiesError(
+                    None, interface_name, list(names), list(sub_table.keys())
+                ) from err
+
+        return key
+
+    def _order_and_slice(
+        self, result: Iterable[Tuple[Any, Mapping[str, Mapping[str, Any]]]]
+    ) -> Iterable[Tuple[Any, Mapping[str, Mapping[str, Any]]]]:
+        """
+        Apply the ordering, offset and limit of this query to its matches.
+
+        If a limit is given, ordering keeps only offset + limit matches in a
+        bounded heap, and without ordering, evaluation stops as soon as the
+        limit is reached.
+        """
+        if self._order is None:
+            if self._offset == 0 and self._limit is None:
+                return result
+            stop = None if self._limit is None else self._offset + self._limit
+            return itertools.islice(result, self._offset, stop)
+
+        (names, descending) = self._order
+        key = self._sort_key(names)
+        try:
+            if self._limit is None:
+                ordered = sorted(result, key=key, reverse=descending)
+            else:
+                select = heapq.nlargest if descending else heapq.nsmallest
+                ordered = select(self._offset + self._limit, result, key=key)
+        except TypeError as err:
+            raise DbusClientOrderingError(
+                'Can not order matches in interface "%s" by properties %s: %s'
+                % (self._interface_name, ", ".join(names), err),
+                self._interface_name,
+                list(names),
+            ) from err
+        return iter(ordered[self._offset :])
+
     def search(
         self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
     ) -> Generator[Tuple[Any, Mapping[str, Mapping[str, Any]]], None, None]:
         """
         Search a GetManagedObjects() result, generating any matches.
 
+        The search follows the plan which plan() describes. The properties
+        of each candidate are compared in an order chosen from a sample of
+        the candidates, and comparison stops at the first which fails. So a
+        checked query raises DbusClientMissingSearchPropertiesError for an
+        object which lacks a property only if no earlier comparison has
+        already rejected the object, and which objects those are may vary
+        with the data.
+
         :raises DbusClientMissingSearchPropertiesError:
+        :raises DbusClientOrderingError:
 
         :returns: a generator of tuples of objects matched by the search
         """
+        return self._search(
+            self._candidates(gmo_result), self._planned_filter_func(gmo_result)
+        )
+
+    def _search(
+        self,
+        candidates: Iterable[Tuple[Any, Mapping[str, Mapping[str, Any]]]],
+        filter_func: Callable[[Mapping[str, Mapping[str, Any]]], bool],
+    ) -> Generator[Tuple[Any, Mapping[str, Mapping[str, Any]]], None, None]:
+        """
+        Search the candidates, generating any matches.
+
+        :raises DbusClientMissingSearchPropertiesError:
+        """
         result = (
             (object_path, data)
-            for (object_path, data) in gmo_result.items()
-            if self._filter_func(data)
+            for (object_path, data) in candidates
+            if filter_func(data)
         )
 
         if self._require_unique:
             list_result = list(result)
             if len(list_result) != 1:
                 raise DbusClientUniqueResultError(
-                    f"No unique match found for interface "
-                    f"{self._interface_name} and properties {self._props}, "
-                    f"found {list_result}",
+                    None,
                     self._interface_name,
                     self._props,
                     list_result,
+                    max_reported_results=self._max_reported_results,
                 )
             result = (x for x in list_result)
 
-        return result
+        return (x for x in self._order_and_slice(result))
+
+    def plan(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> QueryPlan:
+        """
+        Returns the plan by which search() searches a GetManagedObjects()
+        result, with estimates of the number of objects it would visit, match
+        and return. The order of the comparisons and the estimates are drawn
+        from the size of the result and from the first few candidates.
+
+        :rtype: QueryPlan
+        """
+        candidates = self._candidates(gmo_result)
+        visited = len(candidates)
+
+        sample = self._sample(candidates)
+        sample_tables = self._sample_tables(sample)
+        comparisons = _order_comparisons(self._comparisons, sample_tables)
+        sample_matches = sum(
+            1
+            for sub_table in sample_tables
+            if all(
+                sub_table.get(key, _MISSING) == value for (key, value) in comparisons
+            )
+        )
+        selectivity = sample_matches / len(sample) if sample else 0.0
+        matches = round(visited * selectivity)
+
+        stop = None if self._limit is None else self._offset + self._limit
+        if self._order is None:
+            ordering = "none"
+        elif stop is None:
+            ordering = "sort all matches"
+        else:
+            ordering = "bounded heap of %d matches" % stop
+
+        if self._require_unique:
+            termination = "none, every match is needed to check uniqueness"
+        elif self._order is not None or stop is None:
+            termination = "none"
+        else:
+            termination = "after %d matches" % stop
+            if selectivity > 0:
+                visited = min(visited, math.ceil(stop / selectivity))
+            matches = min(matches, stop)
+
+        results = max(0, matches - self._offset)
+        if self._limit is not None:
+            results = min(results, self._limit)
+
+        return QueryPlan(
+            _INDEX_PROBE if isinstance(gmo_result, GMOSnapshot) else _FULL_SCAN,
+            tuple(name for (name, _) in comparisons),
+            ordering,
+            termination,
+            visited,
+            matches,
+            results,
+        )
+
+    def explain(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> QueryPlan:
+        """
+        Returns the plan by which search() searches a GetManagedObjects()
+        result, and run the search by that plan to count the objects it
+        actually visits, matches and returns.
+
+        Usage example:
+
+        >>> print(query.explain(GMOSnapshot(gmo_result)))
+
+        If the query requires a unique match and the search does not find
+        one, the plan reports the objects visited and matched, and no
+        results.
+
+        :rtype: QueryPlan
+        :raises DbusClientMissingSearchPropertiesError:
+        """
+        plan = self.plan(gmo_result)
+        filter_func = self._filter_func(
+            tuple((name, self._props[name]) for name in plan.comparisons)
+        )
+        visited = 0
+        matches = 0
+
+        def counted_candidates():
+            nonlocal visited
+            for entry in self._candidates(gmo_result):
+                visited += 1
+                yield entry
+
+        def counted_filter(data):
+            nonlocal matches
+            match = filter_func(data)
+            matches += match
+            return match
+
+        try:
+            results = sum(1 for _ in self._search(counted_candidates(), counted_filter))
+        except DbusClientUniqueResultError:
+            results = 0
+        return plan._replace(
+            actual_visited=visited, actual_matches=matches, actual_results=results
+        )
+
+
+class GMOBulkResult:
+    """
+    The result of a bulk search of a GetManagedObjects() result.
+    """
+
+    def __init__(
+        self,
+        matches: Dict[Any, List[Tuple[Any, Mapping[str, Mapping[str, Any]]]]],
+        missing: List[Any],
+    ):
+        """
+        Initializer.
+
+        :param dict matches: map from each value which was found to the list
+            of (object_path, data) tuples which matched it
+        :param list missing: the values which were not found
+        """
+        self.matches = matches
+        self.missing = missing
+
+
+class GMOBulkQuery:
+    """
+    Class that implements a search for many values of a single property
+    on the result of a D-Bus GetManagedObjects() call. All values are
+    resolved in a single pass over the result.
+    """
+
+    def __init__(self, interface_name: str, property_name: str, values: Iterable[Any]):
+        """
+        Initializer.
+
+        :param str interface_name: the particular interface
+        :param str property_name: the property whose values are searched for
+        :param values: the values to search for, which must be hashable
+        """
+        self._interface_name = interface_name
+        self._property_name = property_name
+        self._values = list(dict.fromkeys(values))
+        self._require_unique = False
+        self._max_reported_results: Optional[int] = None
+
+    def require_unique_match(
+        self,
+        value: Optional[bool] = True,
+        *,
+        max_reported_results: Optional[int] = None,
+    ):
+        """
+        If value is True, or no value is specified, the search requires
+        that no value match more than one object.
+
+        :param max_reported_results: the most values to list in the message
+            of the error raised if some value is not unique, or None for all
+        :type max_reported_results: int or NoneType
+        """
+        self._require_unique = value
+        self._max_reported_results = max_reported_results
+        return self
+
+    def search(
+        self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]
+    ) -> GMOBulkResult:
+        """
+        Search a GetManagedObjects() result for every value.
+
+        :raises DbusClientMissingSearchPropertiesError:
+        :raises DbusClientBulkUniqueResultError:
+
+        :returns: the objects found for each value, and the values not found
+        :rtype: GMOBulkResult
+        """
+        interface_name = self._interface_name
+        property_name = self._property_name
+        buckets: Dict[Any, List[Tuple[Any, Mapping[str, Mapping[str, Any]]]]] = {
+            value: [] for value in self._values
+        }
+
+        for object_path, data in gmo_result.items():
+            if interface_name not in data:
+                continue
+            sub_table = data[interface_name]
+
+            try:
+                value = sub_table[property_name]
+            except KeyError as err:
+                raise DbusClientMissingSearchPropertiesError(
+                    None, interface_name, [property_name], list(sub_table.keys())
+                ) from err
+
+            try:
+                bucket = buckets.get(value)
+            # An unhashable value can not be equal to any of the values
+            # searched for, which are all hashable.
+            except TypeError:
+                continue
+
+            if bucket is not None:
+                bucket.append((object_path, data))
+
+        matches = {value: bucket for (value, bucket) in buckets.items() if bucket}
+
+        if self._require_unique:
+            duplicates = {
+                value: bucket for (value, bucket) in matches.items() if len(bucket) > 1
+            }
+            if duplicates:
+                raise DbusClientBulkUniqueResultError(
+                    None,
+                    interface_name,
+                    property_name,
+                    duplicates,
+                    max_reported_results=self._max_reported_results,
+                )
+
+        return GMOBulkResult(
+            matches, [value for (value, bucket) in buckets.items() if not bucket]
+        )
+
+
+def _interface_properties(
+    spec: Union["ET.Element", InterfaceSpec],
+) -> Tuple[str, FrozenSet[str]]:
+    """
+    Get the interface name and property names of an interface specification.
+
+    :param spec: the specification of an interface
+    :type spec: Element or InterfaceSpec
+    :raises DbusClientGenerationError:
+    """
+    (interface_name, property_names) = _property_names(spec)
+    return (interface_name, frozenset(property_names))
+
+
+def _check_properties(
+    interface_name: str, specified: Iterable[str], property_names: FrozenSet[str]
+):
+    """
+    Check that every specified property belongs to the interface.
+
+    :param str interface_name: the interface name
+    :param specified: the specified property names
+    :param property_names: the property names of the interface
+    :raises DbusClientUnknownSearchPropertiesError:
+    """
+    specified = list(specified)
+    if not frozenset(specified) <= property_names:
+        fmt_str = (
+            'These properties in the specified query are unknown to interface "%s": %s'
+        )
+        unknown_properties = ", ".join(
+            str(x) for x in frozenset(specified) - property_names
+        )
+        raise DbusClientUnknownSearchPropertiesError(
+            fmt_str % (interface_name, unknown_properties),
+            interface_name,
+            specified,
+            list(property_names),
+        )
 
 
 def mo_query_builder(
-    spec: ET.Element,
+    spec: Union["ET.Element", InterfaceSpec], *, checked: bool = True
 ) -> Callable[[Optional[Mapping[str, Any]]], GMOQuery]:
     """
     Returns a function that builds a GMOQuery object for an interface.
 
     :param spec: the specification of an interface
-    :type spec: Element
+    :type spec: Element or InterfaceSpec
+    :param bool checked: whether the queries check for missing properties
     :returns: a function that builds a GMOQuery object
     :rtype: keywords -> GMOQuery
     """
-
-    try:
-        interface_name = spec.attrib["name"]
-    except KeyError as err:
-        raise DbusClientGenerationError(
-            "No name attribute found for interface."
-        ) from err
-
-    try:
-        property_names = frozenset(p.attrib["name"] for p in spec.findall("./property"))
-    # Currently tests are only run on well-formed specs generated by
-    # Hypothesis, this branch is not covered.
-    except KeyError as err:  # pragma: no cover
-        fmt_str = (
-            'No name attribute found for some property belonging to interface "%s"'
-        )
-        raise DbusClientGenerationError(fmt_str % interface_name) from err
+    (interface_name, property_names) = _interface_properties(spec)
 
     def the_func(props: Optional[Mapping[str, Any]] = None) -> GMOQuery:
         """
@@ -148,22 +743,46 @@ def mo_query_builder(
 
         """
         props = {} if props is None else props
+        _check_properties(interface_name, props.keys(), property_names)
+        return GMOQuery(
+            interface_name, props, checked=checked, property_names=property_names
+        )
 
-        if not frozenset(props.keys()) <= property_names:
-            fmt_str = (
-                "These properties in the specified query are unknown to "
-                'interface "%s": %s'
-            )
-            unknown_properties = ", ".join(
-                str(x) for x in frozenset(props.keys()) - property_names
-            )
-            raise DbusClientUnknownSearchPropertiesError(
-                fmt_str % (interface_name, unknown_properties),
-                interface_name,
-                list(props.keys()),
-                list(property_names),
-            )
+    return the_func
+
+
+def mo_bulk_query_builder(
+    spec: Union["ET.Element", InterfaceSpec],
+) -> Callable[[str, Iterable[Any]], GMOBulkQuery]:
+    """
+    Returns a function that builds a GMOBulkQuery object for an interface.
+
+    Usage example:
 
-        return GMOQuery(interface_name, props)
+    >>> builder = mo_bulk_query_builder(spec)
+    >>> result = builder("Name", pool_names).require_unique_match().search(gmo)
+    >>> result.matches["pool1"]
+    >>> result.missing
+
+    :param spec: the specification of an interface
+    :type spec: Element or InterfaceSpec
+    :returns: a function that builds a GMOBulkQuery object
+    :rtype: str * iterable -> GMOBulkQuery
+    """
+    (interface_name, property_names) = _interface_properties(spec)
+
+    def the_func(property_name: str, values: Iterable[Any]) -> GMOBulkQuery:
+        """
+        Generates a GMOBulkQuery object which searches for the objects whose
+        property has any of the given values.
+
+        :param str property_name: the property
+        :param values: the values to search for, which must be hashable
+        :returns: an appropriately constructed GMOBulkQuery object
+        :rtype: GMOBulkQuery
+        :raises DbusClientUnknownSearchPropertiesError:
+        """
+        _check_properties(interface_name, [property_name], property_names)
+        return GMOBulkQuery(interface_name, property_name, values)
 
     return the_func
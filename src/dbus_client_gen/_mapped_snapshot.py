@@ -0,0 +1,390 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+A compact on-disk format for GetManagedObjects() results, which is read
+through mmap and decoded lazily.
+
+The file consists of a header, the encoded property tables of every object
+and interface, and a directory. The header holds a magic number and the
+location of the directory. The directory lists every object path with the
+location of the table for each of its interfaces, and maps each interface
+to the objects which implement it. Each table holds the property names and
+the location of each property value, followed by the values, each encoded
+separately with marshal, so that a value is decoded only when it is read.
+
+The encoding of marshal may change between Python versions, so the header
+also records the Python and marshal versions which wrote the file, and a file
+written by other versions is rejected. marshal is not secure against
+maliciously constructed data, so only trusted files should be read.
+"""
+
+import marshal
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from ._errors import DbusClientSnapshotFormatError
+from ._snapshot import GMOEntry, GMOSnapshot
+
+_MAGIC = b"DCGSNAP\x02"
+_ENCODING = struct.Struct("<BBH")
+_HEADER = struct.Struct("<8s%dsQQ" % _ENCODING.size)
+_TABLE_HEADER = struct.Struct("<I")
+
+# The Python and marshal versions which encode and decode values.
+_VERSIONS = (sys.version_info[0], sys.version_info[1], marshal.version)
+
+_EXACT_TYPES = frozenset((type(None), bool, int, float, str, bytes))
+
+# The conversion of an instance of a subclass of each builtin type.
+_CONVERSIONS: Tuple[Tuple[type, Callable[[Any], Any]], ...] = (
+    (int, int),
+    (float, float),
+    (str, str),
+    (bytes, bytes),
+)
+
+
+def _check_encoding(encoding: bytes, file_path: str):
+    """
+    Check that a file was encoded by this Python and marshal version.
+
+    :param bytes encoding: the versions recorded in the file
+    :param str file_path: the path of the file
+    :raises DbusClientSnapshotFormatError:
+    """
+    versions = _ENCODING.unpack(encoding)
+    if versions != _VERSIONS:
+        fmt_str = (
+            'File "%s" was written by Python %d.%d with marshal version %d, '
+            "and can not be read by Python %d.%d with marshal version %d"
+        )
+        raise DbusClientSnapshotFormatError(
+            fmt_str % ((file_path,) + versions + _VERSIONS), file_path
+        )
+
+
+def _decode(data: bytes, file_path: str) -> Any:
+    """
+    Decode a value encoded with marshal.
+
+    :param bytes data: the encoded value
+    :param str file_path: the path of the file which holds the value
+    :raises DbusClientSnapshotFormatError:
+    """
+    try:
+        return marshal.loads(data)
+    except (ValueError, EOFError, TypeError) as err:
+        raise DbusClientSnapshotFormatError(
+            'File "%s" is not a valid snapshot: %s' % (file_path, err), file_path
+        ) from err
+
+
+def _plain(value: Any) -> Any:
+    """
+    Convert a value, such as one of the D-Bus types of dbus-python, which
+    are subclasses of Python builtin types, to the builtin type, which
+    marshal can encode. Since bool can not be subclassed, the Boolean type
+    of dbus-python is a subclass of int, and is recognized by its name.
+
+    :param value: the value
+    :raises TypeError: if the value has no equivalent builtin type
+    """
+    if type(value) in _EXACT_TYPES:
+        return value
+    if isinstance(value, int) and type(value).__name__ == "Boolean":
+        return bool(value)
+    for klass, convert in _CONVERSIONS:
+        if isinstance(value, klass):
+            return convert(value)
+    if isinstance(value, dict):
+        return {_plain(key): _plain(item) for (key, item) in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    raise TypeError("No encoding for value of type %s" % type(value).__name__)
+
+
+def _encode_table(table: Mapping[str, Any]) -> bytes:
+    """
+    Encode the property table of one interface of one object.
+
+    :param table: map from property name to value
+    :raises TypeError:
+    """
+    values = [marshal.dumps(_plain(value)) for value in table.values()]
+    ends = []
+    end = 0
+    for value in values:
+        end += len(value)
+        ends.append(end)
+    head = marshal.dumps((tuple(str(name) for name in table.keys()), tuple(ends)))
+    return _TABLE_HEADER.pack(len(head)) + head + b"".join(values)
+
+
+def write_mapped_snapshot(
+    gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]], file_path: str
+):
+    """
+    Write a GetManagedObjects() result to a file in the format read by
+    MappedGMOSnapshot. Object paths, interface names and property names are
+    written as str, and property values as the Python builtin types of
+    which they are instances.
+
+    :param gmo_result: the GetManagedObjects() result
+    :param str file_path: the path of the file to write
+    :raises DbusClientSnapshotFormatError:
+    """
+    objects = []
+    index: Dict[str, List[int]] = {}
+    with open(file_path, "wb") as handle:
+        handle.write(_HEADER.pack(_MAGIC, _ENCODING.pack(*_VERSIONS), 0, 0))
+        for object_number, (object_path, data) in enumerate(gmo_result.items()):
+            entries = []
+            for interface_name, table in data.items():
+                try:
+                    blob = _encode_table(table)
+                except (TypeError, ValueError) as err:
+                    fmt_str = (
+                        'Can not encode properties of interface "%s" '
+                        'for object "%s": %s'
+                    )
+                    raise DbusClientSnapshotFormatError(
+                        fmt_str % (interface_name, object_path, err), file_path
+                    ) from err
+                entries.append((str(interface_name), handle.tell(), len(blob)))
+                handle.write(blob)
+                index.setdefault(str(interface_name), []).append(object_number)
+            objects.append((str(object_path), tuple(entries)))
+
+        directory = marshal.dumps(
+            (
+                tuple(objects),
+                {name: tuple(numbers) for (name, numbers) in index.items()},
+            )
+        )
+        directory_offset = handle.tell()
+        handle.write(directory)
+        handle.seek(0)
+        handle.write(
+            _HEADER.pack(
+                _MAGIC, _ENCODING.pack(*_VERSIONS), directory_offset, len(directory)
+            )
+        )
+
+
+def _read_directory(
+    buffer: mmap.mmap, file_path: str
+) -> Tuple[Any, Dict[str, int], Any]:
+    """
+    Check the header of a snapshot file and decode its directory.
+
+    :param buffer: the mapped file
+    :param str file_path: the path of the mapped file
+    :returns: the objects, the position of each object path among them, and
+        the interface index
+    :raises DbusClientSnapshotFormatError:
+    """
+    try:
+        (magic, encoding, directory_offset, directory_length) = _HEADER.unpack_from(
+            buffer
+        )
+        if magic != _MAGIC:
+            raise ValueError("bad magic number")
+        _check_encoding(encoding, file_path)
+        (objects, index) = _decode(
+            buffer[directory_offset : directory_offset + directory_length], file_path
+        )
+        positions = {
+            object_path: number for (number, (object_path, _)) in enumerate(objects)
+        }
+        if not isinstance(index, dict):
+            raise TypeError("bad interface index")
+    except (ValueError, TypeError) as err:
+        raise DbusClientSnapshotFormatError(
+            'File "%s" is not a valid snapshot: %s' % (file_path, err), file_path
+        ) from err
+    return (objects, positions, index)
+
+
+class _MappedTable(Mapping[str, Any]):
+    """
+    The properties of one interface of one object, decoded on access.
+    """
+
+    def __init__(self, buffer: mmap.mmap, offset: int, file_path: str):
+        """
+        Initializer.
+
+        :param buffer: the mapped file
+        :param int offset: the location of the table
+        :param str file_path: the path of the mapped file
+        :raises DbusClientSnapshotFormatError:
+        """
+        try:
+            (head_length,) = _TABLE_HEADER.unpack_from(buffer, offset)
+            head_start = offset + _TABLE_HEADER.size
+            (names, ends) = _decode(
+                buffer[head_start : head_start + head_length], file_path
+            )
+        except (struct.error, ValueError, TypeError) as err:
+            raise DbusClientSnapshotFormatError(
+                'File "%s" is not a valid snapshot: %s' % (file_path, err), file_path
+            ) from err
+        self._buffer = buffer
+        self._file_path = file_path
+        self._base = head_start + head_length
+        self._positions = {name: number for (number, name) in enumerate(names)}
+        self._ends = ends
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        number = self._positions[name]
+        start = self._base + (self._ends[number - 1] if number else 0)
+        value = _decode(
+            self._buffer[start : self._base + self._ends[number]], self._file_path
+        )
+        self._values[name] = value
+        return value
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+class _MappedObject(Mapping[str, Mapping[str, Any]]):
+    """
+    The interfaces of one object, whose tables are decoded on access.
+    """
+
+    def __init__(
+        self, buffer: mmap.mmap, entries: Sequence[Tuple[str, int, int]], file_path: str
+    ):
+        """
+        Initializer.
+
+        :param buffer: the mapped file
+        :param entries: the name and location of the table of each interface
+        :param str file_path: the path of the mapped file
+        """
+        self._buffer = buffer
+        self._file_path = file_path
+        self._offsets = {name: offset for (name, offset, _) in entries}
+        self._tables: Dict[str, _MappedTable] = {}
+
+    def __getitem__(self, interface_name: str) -> Mapping[str, Any]:
+        table = self._tables.get(interface_name)
+        if table is None:
+            table = _MappedTable(
+                self._buffer, self._offsets[interface_name], self._file_path
+            )
+            self._tables[interface_name] = table
+        return table
+
+    def __contains__(self, interface_name: object) -> bool:
+        return interface_name in self._offsets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+class MappedGMOSnapshot(GMOSnapshot):
+    """
+    A GMOSnapshot read through mmap from a file written by
+    write_mapped_snapshot. Only the directory of the file is decoded when it
+    is opened; the tables of each object and the values of each property are
+    decoded when they are first read, and an error in the file may be
+    reported only then. The per-interface index is read from the file.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Initializer.
+
+        :param str file_path: the path of the snapshot file
+        :raises DbusClientSnapshotFormatError:
+        """
+        with open(file_path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size < _HEADER.size:
+                raise DbusClientSnapshotFormatError(
+                    'File "%s" is too short to be a snapshot' % file_path, file_path
+                )
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (objects, positions, index) = _read_directory(buffer, file_path)
+        except BaseException:
+            buffer.close()
+            raise
+
+        self._buffer = buffer
+        self._file_path = file_path
+        self._objects = objects
+        self._positions = positions
+        self._object_index = index
+        self._cache: Dict[int, _MappedObject] = {}
+        self._index: Dict[str, Sequence[GMOEntry]] = {}
+
+    def _object(self, number: int) -> _MappedObject:
+        """
+        The object at a position in the directory.
+
+        :param int number: the position
+        """
+        data = self._cache.get(number)
+        if data is None:
+            data = _MappedObject(
+                self._buffer, self._objects[number][1], self._file_path
+            )
+            self._cache[number] = data
+        return data
+
+    def __getitem__(self, object_path: Any) -> Mapping[str, Mapping[str, Any]]:
+        return self._object(self._positions[object_path])
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def objects_with_interface(self, interface_name: str) -> Sequence[GMOEntry]:
+        entries = self._index.get(interface_name)
+        if entries is None:
+            entries = tuple(
+                (self._objects[number][0], self._object(number))
+                for number in self._object_index.get(interface_name, ())
+            )
+            self._index[interface_name] = entries
+        return entries
+
+    def close(self):
+        """
+        Release the mapping of the file. The snapshot, and the objects read
+        from it, must not be used afterward.
+        """
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,186 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for measuring the memory used by generated classes, their instances,
+queries, and the GetManagedObjects() results which they wrap.
+"""
+
+import sys
+import tracemalloc
+import types
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Set, Tuple
+
+# Objects of these types are shared with the rest of the program, and are
+# never counted.
+_SHARED_TYPES = (
+    type,
+    types.ModuleType,
+    types.CodeType,
+    types.BuiltinFunctionType,
+    types.MethodWrapperType,
+    types.WrapperDescriptorType,
+)
+
+
+class GMOSizeReport(NamedTuple):
+    """
+    The memory used by a GetManagedObjects() result.
+
+    objects is the memory used by the object paths and by the tables which
+    hold the interfaces of each object. interfaces maps each interface name
+    to the memory used by the properties of that interface over all objects.
+    Memory shared between several entries is counted only once.
+    """
+
+    total: int
+    objects: int
+    interfaces: Dict[str, int]
+
+
+def _slot_values(obj: Any) -> Iterator[Any]:
+    """
+    Generate the values of the slots of obj. A class may name a single slot
+    by a str rather than a sequence of str.
+
+    :param obj: any object
+    """
+    for klass in type(obj).__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for slot in slots:
+            if hasattr(obj, slot):
+                yield getattr(obj, slot)
+
+
+def _referents(obj: Any) -> Iterator[Any]:
+    """
+    Generate the objects which obj owns.
+
+    :param obj: any object
+    """
+    if isinstance(obj, dict):
+        yield from obj.keys()
+        yield from obj.values()
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        yield from obj
+    elif isinstance(obj, types.FunctionType):
+        yield from (
+            x
+            for x in (obj.__closure__, obj.__defaults__, obj.__kwdefaults__)
+            if x is not None
+        )
+        yield obj.__dict__
+    elif isinstance(obj, types.CellType):
+        try:
+            yield obj.cell_contents
+        # A cell is empty only while the function which owns it is being
+        # defined, which a measurement never observes.
+        except ValueError:  # pragma: no cover
+            pass
+    else:
+        if hasattr(obj, "__dict__"):
+            yield obj.__dict__
+        yield from _slot_values(obj)
+
+
+def _walk(roots: Iterable[Any], seen: Set[int]) -> int:
+    """
+    Sum the sizes of roots and all the objects which they own, skipping
+    every object whose id is in seen, and adding every object visited to
+    seen.
+
+    :param roots: the objects to measure
+    :param seen: the ids of objects already counted
+    :returns: the number of bytes
+    """
+    total = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(_referents(obj))
+    return total
+
+
+def deep_sizeof(obj: Any, *, exclude: Iterable[Any] = ()) -> int:
+    """
+    Returns the number of bytes used by obj and every object which it owns.
+    Classes, modules, and code objects are not counted, nor is anything
+    owned by an object in exclude.
+
+    To measure only the memory used by an instance of a generated class, or
+    by a GMOQuery, pass the data which it refers to in exclude.
+
+    :param obj: the object to measure
+    :param exclude: objects whose memory is accounted for elsewhere
+    :rtype: int
+    """
+    seen: Set[int] = set()
+    _walk(exclude, seen)
+    return _walk([obj], seen)
+
+
+def class_sizeof(klass: type) -> int:
+    """
+    Returns the number of bytes used by a class, such as one returned by
+    managed_object_class, including its namespace and the methods and
+    closures which it contains.
+
+    :param type klass: the class
+    :rtype: int
+    """
+    return sys.getsizeof(klass) + deep_sizeof(dict(vars(klass)))
+
+
+def gmo_sizeof(gmo_result: Any) -> GMOSizeReport:
+    """
+    Returns the memory used by a GetManagedObjects() result, broken down by
+    interface.
+
+    :param gmo_result: the GetManagedObjects() result
+    :rtype: GMOSizeReport
+    """
+    seen: Set[int] = set()
+    interfaces: Dict[str, int] = {}
+    objects = sys.getsizeof(gmo_result)
+    seen.add(id(gmo_result))
+    for object_path, data in gmo_result.items():
+        objects += _walk([object_path], seen)
+        objects += sys.getsizeof(data)
+        seen.add(id(data))
+        for interface_name, table in data.items():
+            interfaces[interface_name] = interfaces.get(interface_name, 0) + _walk(
+                [interface_name, table], seen
+            )
+
+    return GMOSizeReport(objects + sum(interfaces.values()), objects, interfaces)
+
+
+def traced_allocation(
+    func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Tuple[Any, int]:
+    """
+    Call func and measure with tracemalloc the number of bytes that remain
+    allocated when it returns, which includes the memory used by its result.
+    Tracing is started for the call if it is not already running.
+
+    :param func: the function to call
+    :returns: the result of the call and the number of bytes
+    :rtype: tuple of object * int
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        (before, _) = tracemalloc.get_traced_memory()
+        result = func(*args, **kwargs)
+        (after, _) = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    return (result, after - before)
@@ -0,0 +1,277 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for generating classes which issue the method calls of an interface
+over a Transport.
+"""
+
+import types
+from typing import Any, Callable, Mapping, Tuple
+from xml.etree.ElementTree import Element
+
+from ._errors import DbusClientArgumentError, DbusClientGenerationError
+from ._transport import MethodCall, PendingReply, Transport
+
+_MISSING = object()
+
+
+class _MethodReply(PendingReply):
+    """
+    Pending reply which unpacks the out arguments of a generated method.
+    """
+
+    def __init__(self, pending: PendingReply, unpack: Callable[[Tuple], Any]):
+        """
+        Initializer.
+
+        :param PendingReply pending: the reply from the transport
+        :param unpack: function to unpack the out arguments
+        """
+        self._pending = pending
+        self._unpack = unpack
+
+    def result(self) -> Any:
+        """
+        Wait for the reply and return its out arguments. If the method has
+        no out arguments, returns None, if it has exactly one, returns its
+        value, otherwise returns a tuple of the values.
+
+        :returns: the unpacked out arguments
+        """
+        return self._unpack(self._pending.result())
+
+
+def _unpacker(out_count: int) -> Callable[[Tuple], Any]:
+    """
+    Returns a function which unpacks a reply with out_count values.
+
+    :param int out_count: the number of out arguments
+    """
+    if out_count == 0:
+        return lambda values: None
+    if out_count == 1:
+        return lambda values: values[0]
+    return tuple
+
+
+def _marshaller(interface_name, method_name, in_names):
+    """
+    Build a function which arranges the arguments of a call in the
+    order required by the method signature.
+
+    :param str interface_name: the interface name
+    :param str method_name: the method name
+    :param in_names: the names of the in arguments, None if unnamed
+    :type in_names: tuple of str or NoneType
+
+    :returns: function from positional and keyword arguments to a tuple
+    """
+    arity = len(in_names)
+    positions = {
+        arg_name: index
+        for (index, arg_name) in enumerate(in_names)
+        if arg_name is not None
+    }
+
+    def arg_error(fmt_str, *fmt_args):
+        return DbusClientArgumentError(
+            fmt_str % fmt_args, interface_name, method_name, list(in_names)
+        )
+
+    def marshal(args: Tuple, kwargs: Mapping[str, Any]) -> Tuple:
+        """
+        Arrange the arguments.
+
+        :raises DbusClientArgumentError:
+        """
+        if not kwargs:
+            if len(args) != arity:
+                raise arg_error(
+                    'Method "%s" of interface "%s" takes %s arguments, got %s',
+                    method_name,
+                    interface_name,
+                    arity,
+                    len(args),
+                )
+            return args
+
+        if len(args) > arity:
+            raise arg_error(
+                'Method "%s" of interface "%s" takes %s arguments, got %s',
+                method_name,
+                interface_name,
+                arity,
+                len(args) + len(kwargs),
+            )
+
+        values = list(args) + [_MISSING] * (arity - len(args))
+        for key, value in kwargs.items():
+            index = positions.get(key)
+            if index is None:
+                raise arg_error(
+                    'Method "%s" of interface "%s" has no argument "%s"',
+                    method_name,
+                    interface_name,
+                    key,
+                )
+            if values[index] is not _MISSING:
+                raise arg_error(
+                    'Method "%s" of interface "%s" got multiple values '
+                    'for argument "%s"',
+                    method_name,
+                    interface_name,
+                    key,
+                )
+            values[index] = value
+
+        if any(value is _MISSING for value in values):
+            raise arg_error(
+                'Method "%s" of interface "%s" is missing some arguments',
+                method_name,
+                interface_name,
+            )
+
+        return tuple(values)
+
+    return marshal
+
+
+def method_proxy_builder(spec: Element) -> Callable:
+    """
+    Returns a function that builds a method interface based on 'spec'.
+    Each method in the interface issues a method call on an object via
+    a Transport and returns a PendingReply without waiting for the reply.
+
+    The signature of every method and the position of every named in
+    argument is computed once, when the class is built.
+
+    :param spec: the interface specification
+    :type spec: Element
+    """
+
+    try:
+        interface_name = spec.attrib["name"]
+    except KeyError as err:
+        raise DbusClientGenerationError(
+            "No name attribute found for interface."
+        ) from err
+
+    def build_method(method):
+        """
+        Build a single method for this class.
+
+        :param Element method: the method specification
+
+        :returns: a method which issues the call
+        """
+        try:
+            method_name = method.attrib["name"]
+        # Currently tests are only run on well-formed specs generated by
+        # Hypothesis, this branch is not covered.
+        except KeyError as err:  # pragma: no cover
+            fmt_str = (
+                'No name attribute found for some method belonging to interface "%s"'
+            )
+            raise DbusClientGenerationError(fmt_str % interface_name) from err
+
+        in_args = []
+        out_count = 0
+        for arg in method.findall("./arg"):
+            if arg.attrib.get("direction", "in") == "in":
+                in_args.append(arg)
+            else:
+                out_count += 1
+
+        try:
+            signature = "".join(arg.attrib["type"] for arg in in_args)
+        # Currently tests are only run on well-formed specs generated by
+        # Hypothesis, this branch is not covered.
+        except KeyError as err:  # pragma: no cover
+            fmt_str = (
+                "No type attribute found for some argument of method "
+                '"%s" belonging to interface "%s"'
+            )
+            raise DbusClientGenerationError(
+                fmt_str % (method_name, interface_name)
+            ) from err
+
+        marshal = _marshaller(
+            interface_name,
+            method_name,
+            tuple(arg.attrib.get("name") for arg in in_args),
+        )
+        unpack = _unpacker(out_count)
+
+        def dbus_func(self, *args, **kwargs) -> PendingReply:
+            """
+            Issue the method call.
+
+            :returns: the pending reply
+            :rtype: PendingReply
+            :raises DbusClientArgumentError:
+            """
+            return _MethodReply(
+                self._transport.send(
+                    self._object_path,
+                    MethodCall(
+                        interface_name, method_name, signature, marshal(args, kwargs)
+                    ),
+                ),
+                unpack,
+            )
+
+        return (method_name, dbus_func)
+
+    def builder(namespace):
+        """
+        The method class's namespace.
+
+        :param namespace: the class's namespace
+        """
+        for method in spec.findall("./method"):
+            (method_name, dbus_func) = build_method(method)
+            namespace[method_name] = dbus_func
+
+        def __init__(self, transport: Transport, object_path: str):
+            """
+            The initializer for this class.
+
+            :param Transport transport: the transport to issue calls on
+            :param str object_path: the object path of the remote object
+            """
+            self._transport = transport
+            self._object_path = object_path
+
+        namespace["__init__"] = __init__
+
+    return builder
+
+
+def method_proxy_class(name: str, spec: Element):
+    """
+    Returns a class with an __init__ function which takes two arguments,
+    a Transport and an object path. The constructed object contains a method
+    for every method in the interface. Calling a method issues the call on
+    the transport and returns a PendingReply immediately, so that many calls
+    may be in flight at once.
+
+    Arguments may be passed by position, or by keyword using the names in
+    the specification.
+
+    Usage example:
+
+    * spec is an XML specification for an interface in the format returned
+    by the Introspect() method.
+    * transport is an object which implements the Transport interface.
+
+    >>> Manager = method_proxy_class("Manager", spec)
+    >>> manager = Manager(transport, "/org/storage/stratis3")
+    >>> replies = [manager.CreatePool(name, devices) for name in names]
+    >>> results = [reply.result() for reply in replies]
+
+    :param str name: the name to give the auto-generated class
+    :param spec: the interface specification
+    :rtype: type
+    """
+    return types.new_class(name, bases=(object,), exec_body=method_proxy_builder(spec))
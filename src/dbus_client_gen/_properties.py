@@ -0,0 +1,298 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for generating classes which read the properties of live objects
+over a Transport.
+"""
+
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+from xml.etree.ElementTree import Element
+
+from ._errors import DbusClientMissingPropertyError
+from ._spec import InterfaceSpec, _property_names
+from ._transport import MethodCall, PendingReply, Transport
+
+_PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+
+
+class _CachedReply(PendingReply):
+    """
+    A reply which has already arrived.
+    """
+
+    def __init__(self, value: Mapping[str, Any]):
+        """
+        Initializer.
+
+        :param value: the properties
+        """
+        self._value = value
+
+    def result(self) -> Mapping[str, Any]:
+        return self._value
+
+
+class _GetAllReply(PendingReply):
+    """
+    The reply to a GetAll call, shared by every reader which requested the
+    properties of the same object and interface while the call was in flight.
+    The reply is resolved once, by the first call to result(); later calls
+    return the same properties, or raise the same error, without touching
+    the fetcher's cache.
+    """
+
+    def __init__(
+        self, fetcher: "PropertyFetcher", key: Tuple[str, str], pending: PendingReply
+    ):
+        """
+        Initializer.
+
+        :param PropertyFetcher fetcher: the fetcher which issued the call
+        :param key: the object path and interface name
+        :param PendingReply pending: the reply from the transport
+        """
+        self._fetcher = fetcher
+        self._key = key
+        self._pending = pending
+        self._lock = threading.Lock()
+        self._done = False
+        self._value: Optional[Mapping[str, Any]] = None
+        self._error: Optional[Exception] = None
+
+    def result(self) -> Mapping[str, Any]:
+        """
+        Wait for the reply and return the properties.
+
+        :returns: map from property name to value
+        """
+        with self._lock:
+            if not self._done:
+                try:
+                    (self._value,) = self._pending.result()
+                except Exception as err:
+                    self._error = err
+                self._done = True
+                self._fetcher._resolve(self._key, self, self._value)
+
+        if self._error is not None:
+            raise self._error
+        assert self._value is not None
+        return self._value
+
+
+class PropertyFetcher:
+    """
+    Reads all the properties of an interface on an object with a single
+    GetAll call. Reads of the same object and interface which are requested
+    while a call is in flight share that call, and its result is cached for
+    a fixed time.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        *,
+        ttl: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializer.
+
+        :param Transport transport: the transport to issue calls on
+        :param float ttl: the number of seconds for which results are cached
+        :param clock: function which returns the current time in seconds
+        """
+        self._transport = transport
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, str], Tuple[float, Mapping[str, Any]]] = {}
+        self._in_flight: Dict[Tuple[str, str], _GetAllReply] = {}
+
+    def fetch(self, object_path: str, interface_name: str) -> PendingReply:
+        """
+        Request the properties of an interface on an object without waiting
+        for them. Issues a GetAll call only if the properties are neither
+        cached nor already requested.
+
+        :param str object_path: the object path
+        :param str interface_name: the interface name
+        :returns: a pending reply whose result is a map of the properties
+        :rtype: PendingReply
+        """
+        key = (object_path, interface_name)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > self._clock():
+                return _CachedReply(entry[1])
+
+            reply = self._in_flight.get(key)
+            if reply is None:
+                reply = _GetAllReply(
+                    self,
+                    key,
+                    self._transport.send(
+                        object_path,
+                        MethodCall(
+                            _PROPERTIES_INTERFACE, "GetAll", "s", (interface_name,)
+                        ),
+                    ),
+                )
+                self._in_flight[key] = reply
+
+            return reply
+
+    def get_all(self, object_path: str, interface_name: str) -> Mapping[str, Any]:
+        """
+        Read the properties of an interface on an object.
+
+        :param str object_path: the object path
+        :param str interface_name: the interface name
+        :returns: map from property name to value
+        """
+        return self.fetch(object_path, interface_name).result()
+
+    def invalidate(
+        self, object_path: Optional[str] = None, interface_name: Optional[str] = None
+    ):
+        """
+        Discard cached properties. If object_path or interface_name is
+        specified, discard only the entries which match it. Calls which are
+        in flight for matching entries are no longer shared, and their
+        replies are not cached, since they may have been sent before the
+        properties changed.
+
+        :param object_path: the object path
+        :type object_path: str or NoneType
+        :param interface_name: the interface name
+        :type interface_name: str or NoneType
+        """
+
+        def matches(key):
+            return object_path in (None, key[0]) and interface_name in (None, key[1])
+
+        with self._lock:
+            self._cache = {
+                key: entry for (key, entry) in self._cache.items() if not matches(key)
+            }
+            self._in_flight = {
+                key: reply
+                for (key, reply) in self._in_flight.items()
+                if not matches(key)
+            }
+
+    def _resolve(
+        self,
+        key: Tuple[str, str],
+        reply: _GetAllReply,
+        value: Optional[Mapping[str, Any]],
+    ):
+        """
+        Stop sharing a call whose reply has arrived and cache its value. A
+        reply for a call which is no longer shared, because it was
+        invalidated while in flight, is not cached.
+
+        :param key: the object path and interface name
+        :param _GetAllReply reply: the reply
+        :param value: the properties, or None if the call failed
+        """
+        with self._lock:
+            if self._in_flight.get(key) is not reply:
+                return
+            del self._in_flight[key]
+            if value is not None:
+                self._cache[key] = (self._clock() + self._ttl, value)
+
+
+def property_fetcher_builder(spec: Union[Element, InterfaceSpec]) -> Callable:
+    """
+    Returns a function that builds a method interface based on 'spec'.
+    This method interface reads the values of the properties of a live
+    object through a PropertyFetcher.
+
+    :param spec: the interface specification
+    :type spec: Element or InterfaceSpec
+    """
+
+    (interface_name, property_names) = _property_names(spec)
+
+    def build_property(name):
+        """
+        Build a single property getter for this class.
+
+        :param str name: the property name
+
+        :returns: the value of the property
+        :rtype: object
+        """
+
+        def dbus_func(self):
+            """
+            The property getter.
+
+            :raises: DbusClientMissingPropertyError
+            """
+            table = self._fetcher.get_all(self._object_path, interface_name)
+            try:
+                return table[name]
+            except KeyError as err:
+                fmt_str = 'No entry found for interface "%s" and property "%s"'
+                raise DbusClientMissingPropertyError(
+                    fmt_str % (interface_name, name), interface_name, name
+                ) from err
+
+        return dbus_func
+
+    def builder(namespace):
+        """
+        The property class's namespace.
+
+        :param namespace: the class's namespace
+        """
+        for name in property_names:
+            namespace[name] = build_property(name)
+
+        def __init__(self, fetcher: PropertyFetcher, object_path: str):
+            """
+            The initializer for this class.
+
+            :param PropertyFetcher fetcher: the fetcher to read properties with
+            :param str object_path: the object path of the remote object
+            """
+            self._fetcher = fetcher
+            self._object_path = object_path
+
+        namespace["__init__"] = __init__
+
+    return builder
+
+
+def property_fetcher_class(name: str, spec: Union[Element, InterfaceSpec]):
+    """
+    Returns a class with an __init__ function which takes two arguments,
+    a PropertyFetcher and an object path. The constructed object contains
+    a method for reading each property of the interface. All reads of the
+    same object are served from a single GetAll call.
+
+    Usage example:
+
+    * spec is an XML specification for an interface in the format returned
+    by the Introspect() method.
+    * transport is an object which implements the Transport interface.
+
+    >>> fetcher = PropertyFetcher(transport, ttl=0.5)
+    >>> Filesystem = property_fetcher_class("Filesystem", spec)
+    >>> fs = Filesystem(fetcher, object_path)
+    >>> fs.Pool()
+
+    :param str name: the name to give the auto-generated class
+    :param spec: the interface specification
+    :rtype: type
+    """
+    return types.new_class(
+        name, bases=(object,), exec_body=property_fetcher_builder(spec)
+    )
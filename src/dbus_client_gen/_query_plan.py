@@ -0,0 +1,116 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+The plan by which a GMOQuery searches a GetManagedObjects() result.
+"""
+
+import math
+from typing import Any, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Access methods
+_INDEX_PROBE = "interface index probe"
+_FULL_SCAN = "full scan with interface check"
+
+# The number of candidates examined to estimate the selectivity of a query.
+_SAMPLE_SIZE = 32
+
+# The value of a property which is missing from a sampled object.
+_MISSING = object()
+
+
+def _comparison_cost(value: Any) -> int:
+    """
+    A rank of the cost of comparing a property value with value. Numbers,
+    booleans and None are cheapest, then strings, then containers.
+
+    :param value: the value searched for
+    :rtype: int
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return 0
+    if isinstance(value, (str, bytes)):
+        return 1
+    return 2
+
+
+def _order_comparisons(
+    comparisons: Tuple[Tuple[str, Any], ...], sample_tables: Sequence[Mapping[str, Any]]
+) -> Tuple[Tuple[str, Any], ...]:
+    """
+    Order comparisons so that a candidate which does not match is rejected
+    as cheaply as possible. If the comparisons are independent, the expected
+    cost is least when they are ordered by their cost divided by the
+    fraction of candidates which they reject, estimated from a sample. A
+    comparison which rejects no sampled candidate is made last. Ties, and
+    the order when there is no sample, are decided by cost alone.
+
+    :param comparisons: pairs of property name and value, ordered by cost
+    :param sample_tables: the property tables of some candidates
+    :returns: the reordered comparisons
+    """
+    if len(comparisons) <= 1 or not sample_tables:
+        return comparisons
+
+    def rank(item: Tuple[str, Any]) -> float:
+        (key, value) = item
+        rejected = sum(
+            1 for sub_table in sample_tables if sub_table.get(key, _MISSING) != value
+        )
+        if rejected == 0:
+            return math.inf
+        return (_comparison_cost(value) + 1) * len(sample_tables) / rejected
+
+    return tuple(sorted(comparisons, key=rank))
+
+
+class QueryPlan(NamedTuple):
+    """
+    How a GMOQuery searches a GetManagedObjects() result.
+
+    access is the way objects are visited: by probing the interface index of
+    a GMOSnapshot, or by scanning every object and checking that it
+    implements the interface; the index is probed whenever the result has
+    one, but a result is never indexed for a single search, since building
+    an index visits every object. comparisons is the order in which the
+    properties of each candidate are compared, chosen by the selectivity of
+    each comparison in a sample of the candidates. ordering is how matches
+    are ordered, and termination when the search stops before it has
+    visited every candidate.
+
+    The estimated counts are derived from the size of the result and from a
+    small sample of the candidates. The actual counts are None unless the
+    plan was returned by GMOQuery.explain().
+    """
+
+    access: str
+    comparisons: Tuple[str, ...]
+    ordering: str
+    termination: str
+    estimated_visited: int
+    estimated_matches: int
+    estimated_results: int
+    actual_visited: Optional[int] = None
+    actual_matches: Optional[int] = None
+    actual_results: Optional[int] = None
+
+    def __str__(self) -> str:
+        def counts(visited, matches, results):
+            return "visited %s, matched %s, returned %s" % (visited, matches, results)
+
+        lines = [
+            "access: %s" % self.access,
+            "comparisons: %s" % (", ".join(self.comparisons) or "none"),
+            "ordering: %s" % self.ordering,
+            "termination: %s" % self.termination,
+            "estimated: %s"
+            % counts(
+                self.estimated_visited, self.estimated_matches, self.estimated_results
+            ),
+        ]
+        if self.actual_visited is not None:
+            lines.append(
+                "actual: %s"
+                % counts(self.actual_visited, self.actual_matches, self.actual_results)
+            )
+        return "\n".join(lines)
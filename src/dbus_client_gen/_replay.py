@@ -0,0 +1,433 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for recording GetManagedObjects() results and the ObjectManager and
+PropertiesChanged signals which modify them, and for replaying a recording
+against client code to measure its latency.
+"""
+
+import marshal
+import math
+import struct
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from ._errors import DbusClientReplayOptionError, DbusClientSnapshotFormatError
+from ._mapped_snapshot import _ENCODING, _VERSIONS, _check_encoding, _plain
+
+_MAGIC = b"DCGREC\x00\x02"
+_RECORD_HEADER = struct.Struct("<I")
+
+_GMO = "gmo"
+_INTERFACES_ADDED = "interfaces_added"
+_INTERFACES_REMOVED = "interfaces_removed"
+_PROPERTIES_CHANGED = "properties_changed"
+
+# The number of fields in a record of each kind.
+_RECORD_LENGTHS = {
+    _GMO: 3,
+    _INTERFACES_ADDED: 4,
+    _INTERFACES_REMOVED: 4,
+    _PROPERTIES_CHANGED: 6,
+}
+
+GMOResult = Mapping[Any, Mapping[str, Mapping[str, Any]]]
+
+
+class GMORecorder:
+    """
+    Writes a sequence of GetManagedObjects() results and the changes made to
+    them by ObjectManager and PropertiesChanged signals to a file, together
+    with the time at which each was recorded.
+
+    Records are encoded with marshal, like a mapped snapshot, so a recording
+    can be replayed only by the Python and marshal versions which wrote it,
+    and only trusted recordings should be replayed.
+    """
+
+    def __init__(self, file_path: str, *, clock: Callable[[], float] = time.monotonic):
+        """
+        Initializer.
+
+        :param str file_path: the path of the recording
+        :param clock: function which returns the current time in seconds
+        """
+        self._file_path = file_path
+        self._clock = clock
+        self._start = clock()
+        self._handle: BinaryIO = open(file_path, "wb")
+        self._handle.write(_MAGIC + _ENCODING.pack(*_VERSIONS))
+
+    def _write(self, *record: Any):
+        """
+        Write a single record, stamped with the time since recording began.
+
+        :raises DbusClientSnapshotFormatError:
+        """
+        try:
+            data = marshal.dumps(
+                _plain((record[0], self._clock() - self._start) + record[1:])
+            )
+        except (TypeError, ValueError) as err:
+            raise DbusClientSnapshotFormatError(
+                'Can not record "%s" event: %s' % (record[0], err), self._file_path
+            ) from err
+        self._handle.write(_RECORD_HEADER.pack(len(data)))
+        self._handle.write(data)
+
+    def record_gmo(self, gmo_result: GMOResult):
+        """
+        Record a complete GetManagedObjects() result.
+
+        :param gmo_result: the GetManagedObjects() result
+        """
+        self._write(_GMO, gmo_result)
+
+    def interfaces_added(
+        self, object_path: Any, interfaces_and_properties: Mapping[str, Mapping]
+    ):
+        """
+        Record an ObjectManager.InterfacesAdded signal.
+
+        :param object_path: the object path
+        :param interfaces_and_properties: map from interface to properties
+        """
+        self._write(_INTERFACES_ADDED, object_path, interfaces_and_properties)
+
+    def interfaces_removed(self, object_path: Any, interfaces: Iterable[str]):
+        """
+        Record an ObjectManager.InterfacesRemoved signal.
+
+        :param object_path: the object path
+        :param interfaces: the names of the removed interfaces
+        """
+        self._write(_INTERFACES_REMOVED, object_path, list(interfaces))
+
+    def properties_changed(
+        self,
+        object_path: Any,
+        interface_name: str,
+        changed_properties: Mapping[str, Any],
+        invalidated_properties: Iterable[str] = (),
+    ):
+        """
+        Record a Properties.PropertiesChanged signal.
+
+        :param object_path: the object path
+        :param str interface_name: the interface name
+        :param changed_properties: map from property name to new value
+        :param invalidated_properties: names of invalidated properties
+        """
+        self._write(
+            _PROPERTIES_CHANGED,
+            object_path,
+            interface_name,
+            changed_properties,
+            list(invalidated_properties),
+        )
+
+    def close(self):
+        """
+        Finish the recording.
+        """
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _read_records(file_path: str) -> Iterator[Tuple[Any, ...]]:
+    """
+    Generate the records of a recording. Each record is checked to be a
+    tuple of the length required by its kind.
+
+    :param str file_path: the path of the recording
+    :raises DbusClientSnapshotFormatError:
+    """
+    with open(file_path, "rb") as handle:
+        magic = handle.read(len(_MAGIC))
+        encoding = handle.read(_ENCODING.size)
+        if magic != _MAGIC or len(encoding) != _ENCODING.size:
+            raise DbusClientSnapshotFormatError(
+                'File "%s" is not a recording' % file_path, file_path
+            )
+        _check_encoding(encoding, file_path)
+        while True:
+            header = handle.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            try:
+                (length,) = _RECORD_HEADER.unpack(header)
+                record = marshal.loads(handle.read(length))
+                if not (
+                    isinstance(record, tuple)
+                    and record
+                    and _RECORD_LENGTHS.get(record[0]) == len(record)
+                ):
+                    raise ValueError("malformed record")
+            except (struct.error, ValueError, EOFError, TypeError) as err:
+                raise DbusClientSnapshotFormatError(
+                    'Recording "%s" is truncated or corrupt: %s' % (file_path, err),
+                    file_path,
+                ) from err
+            yield record
+
+
+# Marks an entry of the base table of a _ReplayState which has been removed.
+_REMOVED = object()
+
+
+class _ReplayState(Mapping[Any, Mapping[str, Mapping[str, Any]]]):
+    """
+    A read-only GetManagedObjects() result which shares most of its entries
+    with the result from which it was derived. Changed entries are kept in a
+    small table of changes over a base table. When the changes outnumber the
+    square root of the number of entries in the base, the two are merged
+    into a new base. A change thus costs O(sqrt(N)) time, amortized, rather
+    than the O(N) of copying the whole result, and no result handed out
+    earlier is modified. Iteration order is that of a dict to which the
+    same changes were made.
+    """
+
+    __slots__ = ("_base", "_changes", "_length")
+
+    def __init__(
+        self,
+        base: Mapping[Any, Any],
+        changes: Optional[Dict[Any, Any]] = None,
+        length: Optional[int] = None,
+    ):
+        """
+        Initializer.
+
+        :param base: the base table, which must not be modified afterward
+        :param changes: map from changed object path to its data or _REMOVED
+        :param length: the number of entries, if known
+        """
+        self._base = base
+        self._changes = {} if changes is None else changes
+        self._length = len(base) if length is None else length
+
+    def __getitem__(self, object_path: Any) -> Mapping[str, Mapping[str, Any]]:
+        try:
+            data = self._changes[object_path]
+        except KeyError:
+            return self._base[object_path]
+        if data is _REMOVED:
+            raise KeyError(object_path)
+        return data
+
+    def __iter__(self) -> Iterator[Any]:
+        changes = self._changes
+        for object_path in self._base:
+            if changes.get(object_path) is not _REMOVED:
+                yield object_path
+        for object_path in changes:
+            if object_path not in self._base:
+                yield object_path
+
+    def __len__(self) -> int:
+        return self._length
+
+    def replace(
+        self, object_path: Any, data: Mapping[str, Mapping[str, Any]]
+    ) -> "_ReplayState":
+        """
+        Returns a result in which the data of an object is replaced.
+
+        :param object_path: the object path
+        :param data: the new data of the object
+        """
+        if self._changes.get(object_path) is _REMOVED:
+            # In a dict, an entry which is removed and then added again
+            # moves to the end.
+            return self._merged().replace(object_path, data)
+        changes = dict(self._changes)
+        changes[object_path] = data
+        length = self._length + (object_path not in self)
+        return _ReplayState(self._base, changes, length)._compacted()
+
+    def remove(self, object_path: Any) -> "_ReplayState":
+        """
+        Returns a result without an object.
+
+        :param object_path: the object path
+        """
+        if object_path not in self:
+            return self
+        changes = dict(self._changes)
+        if object_path in self._base:
+            changes[object_path] = _REMOVED
+        else:
+            del changes[object_path]
+        return _ReplayState(self._base, changes, self._length - 1)._compacted()
+
+    def _compacted(self) -> "_ReplayState":
+        """
+        Merge the changes into the base if they have grown too many.
+        """
+        if len(self._changes) <= math.isqrt(len(self._base)):
+            return self
+        return self._merged()
+
+    def _merged(self) -> "_ReplayState":
+        """
+        The same result, with its changes merged into a new base.
+        """
+        return _ReplayState(dict(self.items()))
+
+
+def _apply(state: _ReplayState, record: Tuple[Any, ...]) -> _ReplayState:
+    """
+    Apply a record to a GetManagedObjects() result. The result is not
+    modified; the table of every object and interface which changes is
+    copied, so that any result previously handed to client code remains
+    consistent.
+
+    :param state: the current result
+    :param record: the record
+    :returns: the new result
+    """
+    kind = record[0]
+    if kind == _GMO:
+        return _ReplayState(record[2])
+
+    object_path = record[2]
+    data = dict(state.get(object_path, {}))
+
+    if kind == _INTERFACES_ADDED:
+        data.update(record[3])
+    elif kind == _INTERFACES_REMOVED:
+        for interface_name in record[3]:
+            data.pop(interface_name, None)
+    else:
+        (interface_name, changed, invalidated) = record[3:]
+        table = dict(data.get(interface_name, {}))
+        table.update(changed)
+        for name in invalidated:
+            table.pop(name, None)
+        data[interface_name] = table
+
+    return state.replace(object_path, data) if data else state.remove(object_path)
+
+
+class OperationLatency(NamedTuple):
+    """
+    Summary of the latencies of one operation over a replay.
+    """
+
+    runs: int
+    mean: float
+    maximum: float
+
+
+class ReplayReport:
+    """
+    The latency of every operation run during a replay.
+    """
+
+    def __init__(self, events: int, latencies: Dict[str, List[float]]):
+        """
+        Initializer.
+
+        :param int events: the number of events replayed
+        :param latencies: map from operation name to the latency, in seconds,
+            of each run of the operation
+        """
+        self.events = events
+        self.latencies = latencies
+
+    def summary(self) -> Dict[str, OperationLatency]:
+        """
+        Summarize the latencies of each operation.
+
+        :rtype: dict of str * OperationLatency
+        """
+        return {
+            name: OperationLatency(
+                len(values),
+                sum(values) / len(values) if values else 0.0,
+                max(values, default=0.0),
+            )
+            for (name, values) in self.latencies.items()
+        }
+
+
+def replay(  # noqa: PLR0913
+    file_path: str,
+    operations: Mapping[str, Callable[[GMOResult], Any]],
+    *,
+    speed: Optional[float] = 1.0,
+    snapshot: Optional[Callable[[GMOResult], GMOResult]] = None,
+    clock: Callable[[], float] = time.perf_counter,
+    sleep: Callable[[float], Any] = time.sleep,
+) -> ReplayReport:
+    """
+    Replay a recording. After each recorded event the current
+    GetManagedObjects() result, a read-only mapping which is not modified
+    by later events, is passed to every operation, and the time each
+    operation takes is measured.
+
+    Usage example:
+
+    >>> query = mo_query_builder(spec)({"Name": "pool1"})
+    >>> report = replay(path, {"search": lambda gmo: list(query.search(gmo))},
+    ...                 speed=10.0, snapshot=GMOSnapshot)
+    >>> report.summary()["search"].maximum
+
+    :param str file_path: the path of the recording
+    :param operations: map from operation name to a function which takes a
+        GetManagedObjects() result
+    :param speed: the positive factor by which to accelerate the original
+        pace, or None to replay without pauses
+    :type speed: float or NoneType
+    :param snapshot: function to wrap each result before it is passed to the
+        operations, for example GMOSnapshot
+    :param clock: function which returns the current time in seconds
+    :param sleep: function which pauses for a number of seconds
+    :rtype: ReplayReport
+    :raises DbusClientSnapshotFormatError:
+    :raises DbusClientReplayOptionError: if speed is not positive
+    """
+    if speed is not None and not speed > 0:
+        raise DbusClientReplayOptionError(
+            "speed must be positive or None, not %r" % (speed,), "speed", speed
+        )
+
+    latencies: Dict[str, List[float]] = {name: [] for name in operations}
+    state = _ReplayState({})
+    events = 0
+    start = clock()
+
+    for record in _read_records(file_path):
+        events += 1
+        state = _apply(state, record)
+
+        if speed is not None:
+            delay = start + record[1] / speed - clock()
+            if delay > 0:
+                sleep(delay)
+
+        view = state if snapshot is None else snapshot(state)
+        for name, operation in operations.items():
+            before = clock()
+            operation(view)
+            latencies[name].append(clock() - before)
+
+    return ReplayReport(events, latencies)
@@ -0,0 +1,202 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for generating a table which routes incoming signals to handlers.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple, Union
+from xml.etree.ElementTree import Element
+
+from ._errors import (
+    DbusClientArgumentError,
+    DbusClientGenerationError,
+    DbusClientUnknownSignalError,
+)
+
+
+class SignalMessage(NamedTuple):
+    """
+    A single signal, as received from the bus.
+    """
+
+    object_path: str
+    interface_name: str
+    member: str
+    args: Tuple[Any, ...]
+
+
+class _SignalEntry:
+    """
+    The information precomputed for a single signal.
+    """
+
+    def __init__(self, arg_names: Tuple[Union[str, int], ...], signature: str):
+        """
+        Initializer.
+
+        :param arg_names: the keys under which the arguments are unpacked
+        :type arg_names: tuple of str or int
+        :param str signature: the signature of the signal
+        """
+        self.arg_names = arg_names
+        self.signature = signature
+        self.handlers: List[Callable[[str, Dict[Union[str, int], Any]], Any]] = []
+
+
+class SignalDispatcher:
+    """
+    Routes signals to the handlers connected to them with a single table
+    lookup on the interface and member name of each signal.
+    """
+
+    def __init__(self, table: Dict[Tuple[str, str], _SignalEntry]):
+        """
+        Initializer.
+
+        :param table: map from interface and member name to signal entry
+        """
+        self._table = table
+
+    def signals(self) -> List[Tuple[str, str]]:
+        """
+        The signals known to this dispatcher.
+
+        :returns: the interface and member name of every signal
+        :rtype: list of (str * str)
+        """
+        return list(self._table.keys())
+
+    def signature(self, interface_name: str, member: str) -> str:
+        """
+        The signature of a signal.
+
+        :param str interface_name: the interface name
+        :param str member: the signal name
+        :rtype: str
+        :raises DbusClientUnknownSignalError:
+        """
+        return self._entry(interface_name, member).signature
+
+    def connect(
+        self,
+        interface_name: str,
+        member: str,
+        handler: Callable[[str, Dict[Union[str, int], Any]], Any],
+    ):
+        """
+        Connect a handler to a signal. When the signal is dispatched the
+        handler is called with the object path of the signal and a dict of
+        its arguments, keyed by the argument names in the specification.
+        Arguments which have no name are keyed by their position.
+
+        :param str interface_name: the interface name
+        :param str member: the signal name
+        :param handler: the handler
+        :raises DbusClientUnknownSignalError:
+        """
+        self._entry(interface_name, member).handlers.append(handler)
+        return self
+
+    def dispatch(self, message: SignalMessage) -> bool:
+        """
+        Dispatch a signal to every handler connected to it.
+
+        :param SignalMessage message: the signal
+        :returns: True if the signal is known to the dispatcher
+        :rtype: bool
+        :raises DbusClientArgumentError:
+        """
+        entry = self._table.get((message.interface_name, message.member))
+        if entry is None:
+            return False
+
+        if entry.handlers:
+            arg_names = entry.arg_names
+            if len(message.args) != len(arg_names):
+                fmt_str = 'Signal "%s" of interface "%s" has %s arguments, got %s'
+                raise DbusClientArgumentError(
+                    fmt_str
+                    % (
+                        message.member,
+                        message.interface_name,
+                        len(arg_names),
+                        len(message.args),
+                    ),
+                    message.interface_name,
+                    message.member,
+                    list(arg_names),
+                )
+
+            args = dict(zip(arg_names, message.args))
+            for handler in entry.handlers:
+                handler(message.object_path, args)
+
+        return True
+
+    def _entry(self, interface_name: str, member: str) -> _SignalEntry:
+        """
+        Look up a signal entry.
+
+        :raises DbusClientUnknownSignalError:
+        """
+        try:
+            return self._table[(interface_name, member)]
+        except KeyError as err:
+            fmt_str = 'No signal "%s" found for interface "%s"'
+            raise DbusClientUnknownSignalError(
+                fmt_str % (member, interface_name), interface_name, member
+            ) from err
+
+
+def signal_dispatcher(specs: Iterable[Element]) -> SignalDispatcher:
+    """
+    Returns a SignalDispatcher for all the signals in the given interface
+    specifications. The names under which the arguments of each signal are
+    unpacked, and its signature, are computed once, here.
+
+    Usage example:
+
+    * specs are XML specifications for interfaces in the format returned by
+    the Introspect() method.
+    * message is a SignalMessage constructed from a signal received on the bus.
+
+    >>> dispatcher = signal_dispatcher(specs)
+    >>> dispatcher.connect(interface_name, "Changed", handler)
+    >>> dispatcher.dispatch(message)
+
+    :param specs: the interface specifications
+    :type specs: iterable of Element
+    :rtype: SignalDispatcher
+    """
+    table = {}
+    for spec in specs:
+        try:
+            interface_name = spec.attrib["name"]
+        except KeyError as err:
+            raise DbusClientGenerationError(
+                "No name attribute found for interface."
+            ) from err
+
+        for signal in spec.findall("./signal"):
+            try:
+                member = signal.attrib["name"]
+                args = signal.findall("./arg")
+                signature = "".join(arg.attrib["type"] for arg in args)
+            # Currently tests are only run on well-formed specs generated by
+            # Hypothesis, this branch is not covered.
+            except KeyError as err:  # pragma: no cover
+                fmt_str = (
+                    "No name or type attribute found for some signal "
+                    'belonging to interface "%s"'
+                )
+                raise DbusClientGenerationError(fmt_str % interface_name) from err
+
+            table[(interface_name, member)] = _SignalEntry(
+                tuple(
+                    arg.attrib.get("name", index) for (index, arg) in enumerate(args)
+                ),
+                signature,
+            )
+
+    return SignalDispatcher(table)
@@ -0,0 +1,59 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+An indexed, read-only view of the result of a GetManagedObjects() call.
+"""
+
+from typing import Any, Dict, Iterator, Mapping, Sequence, Tuple
+
+GMOEntry = Tuple[Any, Mapping[str, Mapping[str, Any]]]
+
+
+class GMOSnapshot(Mapping[Any, Mapping[str, Mapping[str, Any]]]):
+    """
+    A GetManagedObjects() result together with an index from each interface
+    to the objects which implement it. The index for an interface is built
+    the first time it is needed.
+
+    A snapshot may be used wherever a GetManagedObjects() result is expected.
+    Queries use its index to visit only the objects which implement the
+    interface they search. The result which a snapshot wraps must not be
+    modified.
+    """
+
+    def __init__(self, gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]]):
+        """
+        Initializer.
+
+        :param gmo_result: the GetManagedObjects() result
+        """
+        self._gmo_result = gmo_result
+        self._index: Dict[str, Sequence[GMOEntry]] = {}
+
+    def __getitem__(self, object_path: Any) -> Mapping[str, Mapping[str, Any]]:
+        return self._gmo_result[object_path]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._gmo_result)
+
+    def __len__(self) -> int:
+        return len(self._gmo_result)
+
+    def objects_with_interface(self, interface_name: str) -> Sequence[GMOEntry]:
+        """
+        The objects which implement an interface.
+
+        :param str interface_name: the interface name
+        :returns: the object path and data of every such object
+        :rtype: sequence of tuple
+        """
+        entries = self._index.get(interface_name)
+        if entries is None:
+            entries = tuple(
+                (object_path, data)
+                for (object_path, data) in self._gmo_result.items()
+                if interface_name in data
+            )
+            self._index[interface_name] = entries
+        return entries
@@ -0,0 +1,127 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for sharing GetManagedObjects() results between one updating thread and
+many reading threads, in the style of read-copy-update: each new result is
+published by replacing a single reference, so readers never take a lock.
+"""
+
+import threading
+from typing import Any, Callable, Mapping, Optional
+
+from ._snapshot import GMOSnapshot
+
+GMOResult = Mapping[Any, Mapping[str, Mapping[str, Any]]]
+
+
+class PublishedGMOSnapshot(GMOSnapshot):
+    """
+    A GMOSnapshot published by a GMOSnapshotHolder, with the version number
+    under which it was published.
+    """
+
+    def __init__(self, gmo_result: GMOResult, version: int):
+        """
+        Initializer.
+
+        :param gmo_result: the GetManagedObjects() result
+        :param int version: the version number
+        """
+        super().__init__(gmo_result)
+        self.version = version
+
+
+def _copy(gmo_result: GMOResult) -> GMOResult:
+    """
+    Copy a GetManagedObjects() result down to the property tables, so that
+    later changes to the original do not show through the copy.
+
+    :param gmo_result: the GetManagedObjects() result
+    """
+    return {
+        object_path: {
+            interface_name: dict(table) for (interface_name, table) in data.items()
+        }
+        for (object_path, data) in gmo_result.items()
+    }
+
+
+class GMOSnapshotHolder:
+    """
+    Holds the current GMOSnapshot. Readers call current() and run queries,
+    or construct managed object instances, on the snapshot it returns; the
+    snapshot never changes, so everything derived from it stays consistent
+    with the version from which it was derived, however many versions are
+    published afterward. Publishing replaces the reference to the current
+    snapshot in a single assignment, which is atomic, so current() takes no
+    lock. Writers are serialized against each other by a lock which readers
+    never touch.
+
+    The per-interface index of a snapshot may be built by several readers at
+    once; each builds the same index, and the last one stored is kept.
+    """
+
+    def __init__(self, gmo_result: Optional[GMOResult] = None):
+        """
+        Initializer.
+
+        :param gmo_result: the initial GetManagedObjects() result, if any
+        """
+        self._lock = threading.Lock()
+        self._current = PublishedGMOSnapshot(_copy(gmo_result or {}), 0)
+
+    def current(self) -> PublishedGMOSnapshot:
+        """
+        The most recently published snapshot.
+
+        :rtype: PublishedGMOSnapshot
+        """
+        return self._current
+
+    def publish(
+        self, gmo_result: GMOResult, *, copy: bool = True
+    ) -> PublishedGMOSnapshot:
+        """
+        Publish a new GetManagedObjects() result.
+
+        :param gmo_result: the GetManagedObjects() result
+        :param bool copy: if False, the result is published without being
+            copied, and the caller must not modify it afterward
+        :returns: the new snapshot
+        :rtype: PublishedGMOSnapshot
+        """
+        if copy:
+            gmo_result = _copy(gmo_result)
+        with self._lock:
+            return self._swap(gmo_result)
+
+    def update(
+        self, func: Callable[[PublishedGMOSnapshot], GMOResult]
+    ) -> PublishedGMOSnapshot:
+        """
+        Publish the result of applying func to the current snapshot. func
+        must return a new GetManagedObjects() result rather than modify the
+        snapshot; it is called while other writers are excluded, so no
+        update is lost.
+
+        Usage example:
+
+        >>> holder.update(lambda gmo: {**gmo, "/new": {iface: props}})
+
+        :param func: function from the current snapshot to a new result
+        :returns: the new snapshot
+        :rtype: PublishedGMOSnapshot
+        """
+        with self._lock:
+            return self._swap(func(self._current))
+
+    def _swap(self, gmo_result: GMOResult) -> PublishedGMOSnapshot:
+        """
+        Replace the current snapshot. Must be called with the lock held.
+
+        :param gmo_result: the GetManagedObjects() result
+        """
+        snapshot = PublishedGMOSnapshot(gmo_result, self._current.version + 1)
+        self._current = snapshot
+        return snapshot
@@ -0,0 +1,172 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+A compact representation of the properties of an interface specification,
+and code for extracting it from introspection data incrementally.
+"""
+
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from ._errors import DbusClientGenerationError
+
+# The XML parser is imported only when introspection data is parsed, so that
+# specs read from a SpecCache, and queries, do not pay for importing it.
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as ET
+
+
+class PropertySpec(NamedTuple):
+    """
+    The specification of a single property.
+    """
+
+    name: str
+    type: str
+    access: str
+    annotations: Tuple[Tuple[str, str], ...]
+
+
+class InterfaceSpec(NamedTuple):
+    """
+    The name, properties, and annotations of an interface specification.
+    May be used in place of an interface Element by every function which
+    uses only the properties of an interface.
+    """
+
+    name: str
+    properties: Tuple[PropertySpec, ...]
+    annotations: Tuple[Tuple[str, str], ...]
+
+
+def _annotations(element: "ET.Element") -> Tuple[Tuple[str, str], ...]:
+    """
+    The annotations which are children of an element.
+
+    :param element: the element
+    """
+    return tuple(
+        (annotation.get("name", ""), annotation.get("value", ""))
+        for annotation in element.iterfind("./annotation")
+    )
+
+
+def _interface_spec(element: "ET.Element") -> InterfaceSpec:
+    """
+    Extract the spec of an interface from its element.
+
+    :param element: the interface element
+    :raises DbusClientGenerationError:
+    """
+    (interface_name, property_names) = _property_names(element)
+    return InterfaceSpec(
+        interface_name,
+        tuple(
+            PropertySpec(
+                name, prop.get("type", ""), prop.get("access", ""), _annotations(prop)
+            )
+            for (name, prop) in zip(property_names, element.iterfind("./property"))
+        ),
+        _annotations(element),
+    )
+
+
+def parse_interface_specs(
+    source: Union[str, IO[bytes]], interface_names: Optional[Iterable[str]] = None
+) -> Dict[str, InterfaceSpec]:
+    """
+    Parse introspection data incrementally, and extract the spec of each
+    requested interface. Every element is discarded as soon as it has been
+    parsed, unless it belongs to a requested interface, in which case it is
+    discarded as soon as the interface has been extracted, so memory use
+    depends only on the size of the largest requested interface.
+
+    Usage example:
+
+    >>> specs = parse_interface_specs("introspect.xml", ["org.storage.Pool"])
+    >>> Pool = managed_object_class("Pool", specs["org.storage.Pool"])
+
+    :param source: the name of a file, or a binary file object
+    :param interface_names: the interfaces to extract, by default all
+    :type interface_names: iterable of str or NoneType
+    :returns: map from interface name to spec
+    :rtype: dict of str * InterfaceSpec
+    :raises DbusClientGenerationError:
+    """
+    import xml.etree.ElementTree as ET  # noqa: PLC0415
+
+    wanted = None if interface_names is None else frozenset(interface_names)
+    specs = {}
+
+    # The elements which are open, and the depth within the stack of the
+    # open requested interface, if any.
+    stack: List["ET.Element"] = []
+    keep: Optional[int] = None
+    try:
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if (
+                    keep is None
+                    and element.tag == "interface"
+                    and (wanted is None or element.get("name") in wanted)
+                ):
+                    keep = len(stack)
+                stack.append(element)
+                continue
+
+            stack.pop()
+            if keep == len(stack):
+                spec = _interface_spec(element)
+                specs[spec.name] = spec
+                keep = None
+            if keep is None and stack:
+                del stack[-1][-1]
+    except ET.ParseError as err:
+        raise DbusClientGenerationError(
+            "Introspection data could not be parsed: %s" % err
+        ) from err
+
+    return specs
+
+
+def _property_names(
+    spec: Union["ET.Element", InterfaceSpec],
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Get the interface name and property names of an interface specification.
+
+    :param spec: the specification of an interface
+    :type spec: Element or InterfaceSpec
+    :raises DbusClientGenerationError:
+    """
+    if isinstance(spec, InterfaceSpec):
+        return (spec.name, tuple(prop.name for prop in spec.properties))
+
+    try:
+        interface_name = spec.attrib["name"]
+    except KeyError as err:
+        raise DbusClientGenerationError(
+            "No name attribute found for interface."
+        ) from err
+
+    try:
+        property_names = tuple(p.attrib["name"] for p in spec.findall("./property"))
+    # Currently tests are only run on well-formed specs generated by
+    # Hypothesis, this branch is not covered.
+    except KeyError as err:  # pragma: no cover
+        fmt_str = (
+            'No name attribute found for some property belonging to interface "%s"'
+        )
+        raise DbusClientGenerationError(fmt_str % interface_name) from err
+
+    return (interface_name, property_names)
@@ -0,0 +1,198 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+A persistent cache of the interface specs extracted from introspection data,
+keyed by a digest of the data.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ._spec import InterfaceSpec, PropertySpec, parse_interface_specs
+
+_FORMAT_VERSION = 1
+_SUFFIX = ".json"
+
+
+def _encode(specs: Dict[str, InterfaceSpec]) -> str:
+    """
+    Encode extracted specs as JSON.
+
+    :param specs: map from interface name to spec
+    """
+    return json.dumps(
+        {
+            "version": _FORMAT_VERSION,
+            "interfaces": [
+                [spec.name, [list(prop) for prop in spec.properties], spec.annotations]
+                for spec in specs.values()
+            ],
+        }
+    )
+
+
+def _annotations(value: List[List[str]]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Decode a list of annotations.
+
+    :param value: the encoded annotations
+    """
+    return tuple((name, annotation) for (name, annotation) in value)
+
+
+def _decode(data: Any) -> Dict[str, InterfaceSpec]:
+    """
+    Decode specs encoded by _encode.
+
+    :param data: the decoded JSON document
+    :raises ValueError: if the document is not in the expected format
+    """
+    if not isinstance(data, dict) or data.get("version") != _FORMAT_VERSION:
+        raise ValueError("unknown cache entry format")
+
+    try:
+        return {
+            name: InterfaceSpec(
+                name,
+                tuple(
+                    PropertySpec(prop_name, prop_type, access, _annotations(notes))
+                    for (prop_name, prop_type, access, notes) in properties
+                ),
+                _annotations(annotations),
+            )
+            for (name, properties, annotations) in data["interfaces"]
+        }
+    except (KeyError, TypeError) as err:
+        raise ValueError("malformed cache entry: %s" % err) from err
+
+
+class SpecCache:
+    """
+    A directory of interface specs extracted from introspection data, so
+    that the same data need not be parsed again, even by another process.
+
+    Each entry is keyed by a digest of the introspection data and of the
+    names of the interfaces requested from it. Entries are written to a
+    temporary file which then atomically replaces the entry, so concurrent
+    readers and writers never see a partial entry; an entry which can not
+    be read is treated as missing and replaced. When the entries exceed the
+    size bound, the least recently used are removed.
+    """
+
+    def __init__(self, directory: str, *, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initializer.
+
+        :param str directory: the cache directory, created if absent
+        :param int max_bytes: the bound on the total size of all entries
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, xml_data: bytes, interface_names: Optional[List[str]]) -> str:
+        """
+        The path of the entry for some introspection data.
+
+        :param bytes xml_data: the introspection data
+        :param interface_names: the requested interfaces, sorted, or None
+        """
+        digest = hashlib.sha256(xml_data)
+        digest.update(b"\0")
+        digest.update(
+            b"*" if interface_names is None else "\n".join(interface_names).encode()
+        )
+        return os.path.join(self._directory, digest.hexdigest() + _SUFFIX)
+
+    def specs(
+        self, xml_data: bytes, interface_names: Optional[Iterable[str]] = None
+    ) -> Dict[str, InterfaceSpec]:
+        """
+        Returns the specs extracted from introspection data, reading them from
+        the cache if they are present, and otherwise parsing the data with
+        parse_interface_specs and storing the result.
+
+        Usage example:
+
+        >>> cache = SpecCache(os.path.expanduser("~/.cache/myapp/specs"))
+        >>> specs = cache.specs(xml_data, ["org.storage.Pool"])
+        >>> Pool = managed_object_class("Pool", specs["org.storage.Pool"])
+
+        :param bytes xml_data: the introspection data
+        :param interface_names: the interfaces to extract, by default all
+        :type interface_names: iterable of str or NoneType
+        :rtype: dict of str * InterfaceSpec
+        :raises DbusClientGenerationError:
+        """
+        names = None if interface_names is None else sorted(set(interface_names))
+        path = self._path(xml_data, names)
+
+        try:
+            with open(path, encoding="utf-8") as handle:
+                specs = _decode(json.load(handle))
+            os.utime(path)
+        except (OSError, ValueError):
+            pass
+        else:
+            self.hits += 1
+            return specs
+
+        self.misses += 1
+        specs = parse_interface_specs(io.BytesIO(xml_data), names)
+        self._store(path, _encode(specs))
+        return specs
+
+    def _store(self, path: str, contents: str):
+        """
+        Atomically write an entry, then evict entries if over the bound.
+        A failure to write is ignored, since the cache is only an aid.
+
+        :param str path: the path of the entry
+        :param str contents: the contents of the entry
+        """
+        try:
+            (handle, temporary) = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as file:
+                file.write(contents)
+            os.replace(temporary, path)
+        # Reached only if the disk fails or fills while the entry is written.
+        except OSError:  # pragma: no cover
+            with contextlib.suppress(OSError):
+                os.unlink(temporary)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used entries until the total size of the
+        entries is within the bound. Entries removed by another process in
+        the meantime are skipped.
+        """
+        entries = []
+        with os.scandir(self._directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(_SUFFIX):
+                    with contextlib.suppress(FileNotFoundError):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for (_, size, _) in entries)
+        for _, size, path in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+            total -= size
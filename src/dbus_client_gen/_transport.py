@@ -0,0 +1,64 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Interface between generated client code and the D-Bus connection which
+carries its method calls.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, NamedTuple, Tuple
+
+
+class MethodCall(NamedTuple):
+    """
+    A single, fully marshalled, D-Bus method call.
+    """
+
+    interface_name: str
+    method_name: str
+    signature: str
+    args: Tuple[Any, ...]
+
+
+class PendingReply(ABC):
+    """
+    The reply to a method call which may not yet have arrived.
+    """
+
+    @abstractmethod
+    def result(self) -> Any:
+        """
+        Wait for the reply, if necessary, and return it. This method may be
+        called more than once, and from more than one thread.
+
+        :returns: the values of the out arguments of the method, as a tuple
+        :rtype: tuple
+        """
+
+
+class Transport(ABC):
+    """
+    A connection on which method calls can be issued.
+
+    Calls are issued with send(), which must not wait for the reply, so that
+    a client may issue many calls before collecting the results of any.
+    """
+
+    @abstractmethod
+    def send(self, object_path: str, call: MethodCall) -> PendingReply:
+        """
+        Issue a method call on an object without waiting for its reply.
+
+        :param str object_path: the object path
+        :param MethodCall call: the method call
+        :returns: the pending reply
+        :rtype: PendingReply
+        """
+
+    def flush(self):
+        """
+        Issue any calls which the transport has queued but not yet sent.
+
+        The default implementation does nothing.
+        """
@@ -0,0 +1,256 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Code for checking the result of a GetManagedObjects() call against a set of
+interface specifications once, so that the classes and queries used on the
+result afterward need not check every access.
+"""
+
+import types
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, Union
+from xml.etree.ElementTree import Element
+
+from ._errors import DbusClientGenerationError, DbusClientValidationError
+from ._managed_objects import managed_object_builder
+from ._managed_objects_queries import GMOQuery, _interface_properties, mo_query_builder
+from ._spec import InterfaceSpec
+
+
+class GMOValidationReport:
+    """
+    Every interface and property missing from a GetManagedObjects() result.
+    """
+
+    def __init__(
+        self,
+        missing_interfaces: Dict[Any, List[str]],
+        missing_properties: Dict[Tuple[Any, str], List[str]],
+    ):
+        """
+        Initializer.
+
+        :param missing_interfaces: map from object path to missing interfaces
+        :param missing_properties: map from object path and interface name to
+            missing properties
+        """
+        self.missing_interfaces = missing_interfaces
+        self.missing_properties = missing_properties
+
+    @property
+    def valid(self) -> bool:
+        """
+        True if nothing is missing.
+        """
+        return not (self.missing_interfaces or self.missing_properties)
+
+    def __str__(self) -> str:
+        lines = [
+            'Object "%s" is missing interfaces: %s'
+            % (object_path, ", ".join(interface_names))
+            for (object_path, interface_names) in self.missing_interfaces.items()
+        ]
+        lines.extend(
+            'Object "%s" is missing properties of interface "%s": %s'
+            % (object_path, interface_name, ", ".join(names))
+            for (
+                (object_path, interface_name),
+                names,
+            ) in self.missing_properties.items()
+        )
+        return "\n".join(lines)
+
+
+def _required_groups(
+    interface_names: Iterable[str], required: Optional[Iterable[Iterable[str]]]
+) -> List[FrozenSet[str]]:
+    """
+    Check the groups of interfaces which must be implemented together.
+
+    :param interface_names: the names of the specified interfaces
+    :param required: the groups of interfaces, or None
+    :raises DbusClientGenerationError:
+    """
+    interface_names = list(interface_names)
+    groups = [] if required is None else [frozenset(group) for group in required]
+
+    unknown = frozenset().union(*groups).difference(interface_names)
+    if unknown:
+        raise DbusClientGenerationError(
+            "Interfaces %s were not among those specified: %s"
+            % (", ".join(sorted(unknown)), ", ".join(interface_names))
+        )
+
+    return groups
+
+
+def _validate(
+    gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]],
+    interfaces: Mapping[str, FrozenSet[str]],
+    groups: Iterable[FrozenSet[str]],
+) -> GMOValidationReport:
+    """
+    Validate a GetManagedObjects() result.
+
+    :param gmo_result: the GetManagedObjects() result
+    :param interfaces: map from interface name to property names
+    :param groups: sets of interfaces which must be implemented together
+    """
+    groups = list(groups)
+    missing_interfaces = {}
+    missing_properties = {}
+    for object_path, data in gmo_result.items():
+        absent = set()
+        for group in groups:
+            if not group.isdisjoint(data):
+                absent.update(group.difference(data))
+        if absent:
+            missing_interfaces[object_path] = sorted(absent)
+
+        for interface_name, property_names in interfaces.items():
+            if interface_name in data:
+                missing = property_names.difference(data[interface_name])
+                if missing:
+                    missing_properties[(object_path, interface_name)] = sorted(missing)
+
+    return GMOValidationReport(missing_interfaces, missing_properties)
+
+
+def validate_gmo(
+    gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]],
+    specs: Iterable[Union[Element, InterfaceSpec]],
+    *,
+    required: Optional[Iterable[Iterable[str]]] = None,
+) -> GMOValidationReport:
+    """
+    Check a GetManagedObjects() result against a set of interfaces. Every
+    object must have a value for every property of each of the interfaces
+    which it implements. Objects which implement none of the interfaces are
+    not checked.
+
+    Each group in required is a set of interfaces which are implemented
+    together: every object which implements any interface of a group must
+    implement all of them.
+
+    Usage example:
+
+    >>> validate_gmo(gmo, [pool_spec, pool_r1_spec],
+    ...     required=[["org.storage.Pool", "org.storage.Pool.r1"]])
+
+    :param gmo_result: the GetManagedObjects() result
+    :param specs: the interface specifications
+    :type specs: iterable of Element or InterfaceSpec
+    :param required: groups of interfaces which must be implemented together
+    :type required: iterable of iterable of str or NoneType
+    :returns: a report of every missing interface and property
+    :rtype: GMOValidationReport
+    :raises DbusClientGenerationError:
+    """
+    interfaces = dict(_interface_properties(spec) for spec in specs)
+    return _validate(gmo_result, interfaces, _required_groups(interfaces, required))
+
+
+class ValidatedGMO:
+    """
+    A GetManagedObjects() result which has been validated against a set of
+    interface specifications, as by validate_gmo. The classes and queries
+    which it hands out do not check for missing properties, because
+    validation has already established that there are none.
+
+    The result must not be modified after it has been validated.
+    """
+
+    def __init__(
+        self,
+        gmo_result: Mapping[Any, Mapping[str, Mapping[str, Any]]],
+        specs: Iterable[Union[Element, InterfaceSpec]],
+        *,
+        required: Optional[Iterable[Iterable[str]]] = None,
+    ):
+        """
+        Initializer.
+
+        :param gmo_result: the GetManagedObjects() result
+        :param specs: the interface specifications
+        :type specs: iterable of Element or InterfaceSpec
+        :param required: groups of interfaces which must be implemented
+            together, as for validate_gmo
+        :type required: iterable of iterable of str or NoneType
+        :raises DbusClientGenerationError:
+        :raises DbusClientValidationError:
+        """
+        specs = list(specs)
+        properties = [_interface_properties(spec) for spec in specs]
+        interfaces = dict(properties)
+
+        report = _validate(
+            gmo_result, interfaces, _required_groups(interfaces, required)
+        )
+        if not report.valid:
+            raise DbusClientValidationError(
+                "GetManagedObjects() result does not conform to the "
+                "specified interfaces:\n%s" % report,
+                report,
+            )
+
+        self.gmo_result = gmo_result
+        self._specs = {
+            interface_name: spec
+            for ((interface_name, _), spec) in zip(properties, specs)
+        }
+        self._query_builders = {
+            interface_name: mo_query_builder(spec, checked=False)
+            for (interface_name, spec) in self._specs.items()
+        }
+
+    def managed_object_class(self, name: str, interface_name: str):
+        """
+        Returns a class like that returned by managed_object_class, but
+        whose property getters do not check for missing properties. It must
+        only be constructed from entries of this result.
+
+        :param str name: the name to give the auto-generated class
+        :param str interface_name: the interface, which must be one of those
+            this result was validated against
+        :rtype: type
+        :raises DbusClientGenerationError:
+        """
+        return types.new_class(
+            name,
+            bases=(object,),
+            exec_body=managed_object_builder(
+                self._validated(self._specs, interface_name), checked=False
+            ),
+        )
+
+    def query(
+        self, interface_name: str, props: Optional[Mapping[str, Any]] = None
+    ) -> GMOQuery:
+        """
+        Returns a query like that returned by the function which
+        mo_query_builder builds, but which does not check for missing
+        properties. It must only be run on this result.
+
+        :param str interface_name: the interface, which must be one of those
+            this result was validated against
+        :param props: a specification of properties to restrict values
+        :type props: Mapping of str * object or NoneType
+        :rtype: GMOQuery
+        :raises DbusClientGenerationError:
+        :raises DbusClientUnknownSearchPropertiesError:
+        """
+        return self._validated(self._query_builders, interface_name)(props)
+
+    @staticmethod
+    def _validated(table: Mapping[str, Any], interface_name: str) -> Any:
+        """
+        Look up an entry for a validated interface.
+
+        :raises DbusClientGenerationError:
+        """
+        try:
+            return table[interface_name]
+        except KeyError as err:
+            raise DbusClientGenerationError(
+                'Interface "%s" was not validated' % interface_name
+            ) from err
@@ -0,0 +1,71 @@
+"""
+In-process fake of a D-Bus connection.
+"""
+
+from dbus_client_gen import PendingReply, Transport
+
+
+class FakePendingReply(PendingReply):
+    """
+    A reply which is only computed when the transport is flushed.
+    """
+
+    def __init__(self, transport):
+        """
+        Initializer.
+
+        :param FakeTransport transport: the transport which issued the call
+        """
+        self._transport = transport
+        self.done = False
+        self.value = None
+        self.error = None
+
+    def result(self):
+        if not self.done:
+            self._transport.flush()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class FakeTransport(Transport):
+    """
+    A transport which queues calls and dispatches all of them to local
+    handlers when flushed. Each flush counts as a single round trip.
+    """
+
+    def __init__(self, handlers):
+        """
+        Initializer.
+
+        :param handlers: map from (interface name, method name) to a function
+            which takes an object path and the call arguments and returns a
+            tuple of out arguments
+        :type handlers: dict of (str * str) * function
+        """
+        self.handlers = handlers
+        self.queue = []
+        self.calls = []
+        self.round_trips = 0
+
+    def send(self, object_path, call):
+        reply = FakePendingReply(self)
+        self.queue.append((object_path, call, reply))
+        return reply
+
+    def flush(self):
+        if not self.queue:
+            return
+
+        self.round_trips += 1
+        (queue, self.queue) = (self.queue, [])
+        for object_path, call, reply in queue:
+            self.calls.append((object_path, call))
+            try:
+                reply.value = self.handlers[(call.interface_name, call.method_name)](
+                    object_path, *call.args
+                )
+            except Exception as err:
+                reply.error = err
+            reply.done = True
@@ -6,13 +6,105 @@
 Deterministic testing of method generation and execution.
 """
 
+import io
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import threading
+import tracemalloc
 import unittest
 import xml.etree.ElementTree as ET
 
-from dbus_client_gen import GMOQuery, managed_object_class, mo_query_builder
+from dbus_client_gen import (
+    GMOQuery,
+    GMORecorder,
+    GMOSnapshot,
+    GMOSnapshotHolder,
+    ManagedObjectMap,
+    MappedGMOSnapshot,
+    PropertyFetcher,
+    SignalMessage,
+    SpecCache,
+    ValidatedGMO,
+    class_sizeof,
+    composite_managed_object_class,
+    deep_sizeof,
+    gmo_sizeof,
+    managed_object_class,
+    method_proxy_class,
+    mo_bulk_query_builder,
+    mo_query_builder,
+    parse_interface_specs,
+    property_fetcher_class,
+    replay,
+    signal_dispatcher,
+    traced_allocation,
+    validate_gmo,
+    write_mapped_snapshot,
+)
 from dbus_client_gen._errors import (
+    DbusClientArgumentError,
+    DbusClientBulkUniqueResultError,
     DbusClientGenerationError,
+    DbusClientMissingInterfaceError,
+    DbusClientMissingPropertyError,
+    DbusClientMissingSearchPropertiesError,
+    DbusClientOrderingError,
+    DbusClientQueryOptionError,
+    DbusClientReplayOptionError,
+    DbusClientSearchConditionError,
+    DbusClientSnapshotFormatError,
     DbusClientUniqueResultError,
+    DbusClientUnknownSearchPropertiesError,
+    DbusClientUnknownSignalError,
+    DbusClientValidationError,
+)
+from dbus_client_gen._replay import _ReplayState
+from tests._transport import FakeTransport
+
+_POOL_SPEC = ET.fromstring(
+    """
+<interface name="org.storage.Pool">
+  <property name="Name" type="s" access="read"/>
+  <property name="Size" type="t" access="read"/>
+  <property name="Encrypted" type="b" access="read"/>
+</interface>
+"""
+)
+
+_POOL_R1_SPEC = ET.fromstring(
+    """
+<interface name="org.storage.Pool.r1">
+  <property name="Uuid" type="s" access="read"/>
+</interface>
+"""
+)
+
+_MANAGER_SPEC = ET.fromstring(
+    """
+<interface name="org.storage.Manager">
+  <method name="CreatePool">
+    <arg name="name" type="s" direction="in"/>
+    <arg name="devices" type="as" direction="in"/>
+    <arg name="result" type="(bo)" direction="out"/>
+    <arg name="return_code" type="q" direction="out"/>
+  </method>
+  <method name="Ping"/>
+  <method name="Version">
+    <arg name="version" type="s" direction="out"/>
+  </method>
+  <method name="Fail">
+    <arg type="s"/>
+  </method>
+  <signal name="PoolAdded">
+    <arg name="object_path" type="o"/>
+    <arg type="s"/>
+  </signal>
+  <signal name="Stopped"/>
+</interface>
+"""
 )
 
 
@@ -31,6 +123,18 @@ class DeterministicTestCase(unittest.TestCase):
             managed_object_class("Fail", ET.Element("name", {}))
         with self.assertRaises(DbusClientGenerationError):
             mo_query_builder(ET.Element("name", {}))
+        with self.assertRaises(DbusClientGenerationError):
+            method_proxy_class("Fail", ET.Element("name", {}))
+        with self.assertRaises(DbusClientGenerationError):
+            signal_dispatcher([ET.Element("name", {})])
+        with self.assertRaises(DbusClientGenerationError):
+            property_fetcher_class("Fail", ET.Element("name", {}))
+        with self.assertRaises(DbusClientGenerationError):
+            validate_gmo({}, [ET.Element("name", {})])
+        with self.assertRaises(DbusClientGenerationError):
+            mo_bulk_query_builder(ET.Element("name", {}))
+        with self.assertRaises(DbusClientGenerationError):
+            composite_managed_object_class("Fail", [ET.Element("name", {})])
 
     def test_unique_match(self):
         """
@@ -55,3 +159,1702 @@ class DeterministicTestCase(unittest.TestCase):
             GMOQuery(
                 "interface_name", {"prop_name": "prop_value"}
             ).require_unique_match().search({})
+
+
+class MethodProxyTestCase(unittest.TestCase):
+    """
+    Test generated method proxies against a fake transport.
+    """
+
+    def setUp(self):
+        self.transport = FakeTransport(
+            {
+                ("org.storage.Manager", "CreatePool"): lambda op, name, devices: (
+                    (True, f"{op}/{name}"),
+                    len(devices),
+                ),
+                ("org.storage.Manager", "Ping"): lambda op: (),
+                ("org.storage.Manager", "Version"): lambda op: ("3.8.0",),
+                ("org.storage.Manager", "Fail"): lambda op, _: 1 / 0,
+            }
+        )
+        self.manager = method_proxy_class("Manager", _MANAGER_SPEC)(
+            self.transport, "/top"
+        )
+
+    def test_marshalling(self):
+        """
+        Verify that the call carries the precomputed signature and that
+        keyword arguments are placed in signature order.
+        """
+        reply = self.manager.CreatePool(devices=["/dev/a"], name="pn")
+        self.assertEqual(reply.result(), ((True, "/top/pn"), 1))
+
+        (object_path, call) = self.transport.calls[0]
+        self.assertEqual(object_path, "/top")
+        self.assertEqual(call.signature, "sas")
+        self.assertEqual(call.args, ("pn", ["/dev/a"]))
+
+        self.assertEqual(self.manager.CreatePool("pn", devices=[]).result()[1], 0)
+
+    def test_unpacking(self):
+        """
+        Verify that replies are unpacked according to their out arguments.
+        """
+        self.assertIsNone(self.manager.Ping().result())
+        self.assertEqual(self.manager.Version().result(), "3.8.0")
+
+    def test_pipelining(self):
+        """
+        Verify that many calls issued before any reply is read share a
+        single round trip.
+        """
+        replies = [self.manager.CreatePool(str(i), []) for i in range(100)]
+        self.assertEqual(self.transport.round_trips, 0)
+        self.assertEqual(
+            [reply.result()[0][1] for reply in replies],
+            [f"/top/{i}" for i in range(100)],
+        )
+        self.assertEqual(self.transport.round_trips, 1)
+
+    def test_errors(self):
+        """
+        Verify that bad arguments are detected before the call is issued and
+        that errors from the transport are raised by result().
+        """
+        for args, kwargs in [
+            (("pn",), {}),
+            (("pn", [], 1), {"name": "pn"}),
+            ((), {"name": "pn", "size": 3}),
+            (("pn",), {"name": "pn"}),
+            ((), {"name": "pn"}),
+        ]:
+            with self.assertRaises(DbusClientArgumentError) as context:
+                self.manager.CreatePool(*args, **kwargs)
+            self.assertEqual(context.exception.member_name, "CreatePool")
+            self.assertEqual(context.exception.arg_names, ["name", "devices"])
+
+        self.assertEqual(self.transport.queue, [])
+
+        with self.assertRaises(DbusClientArgumentError):
+            self.manager.Fail(arg="x")
+
+        with self.assertRaises(ZeroDivisionError):
+            self.manager.Fail("x").result()
+
+
+class SignalDispatcherTestCase(unittest.TestCase):
+    """
+    Test dispatch of synthetic signals.
+    """
+
+    def setUp(self):
+        self.dispatcher = signal_dispatcher(
+            [_MANAGER_SPEC, ET.Element("interface", {"name": "org.Other"})]
+        )
+        self.received = []
+
+    def test_dispatch(self):
+        """
+        Verify that arguments are unpacked by name, or position if unnamed,
+        and that every connected handler receives the signal.
+        """
+        self.assertEqual(
+            sorted(self.dispatcher.signals()),
+            [("org.storage.Manager", "PoolAdded"), ("org.storage.Manager", "Stopped")],
+        )
+        self.assertEqual(
+            self.dispatcher.signature("org.storage.Manager", "PoolAdded"), "os"
+        )
+
+        self.dispatcher.connect(
+            "org.storage.Manager",
+            "PoolAdded",
+            lambda op, args: self.received.append((op, args)),
+        ).connect(
+            "org.storage.Manager",
+            "PoolAdded",
+            lambda op, args: self.received.append(args[1]),
+        )
+
+        self.assertTrue(
+            self.dispatcher.dispatch(
+                SignalMessage("/top", "org.storage.Manager", "PoolAdded", ("/p", "n"))
+            )
+        )
+        self.assertEqual(self.received, [("/top", {"object_path": "/p", 1: "n"}), "n"])
+
+        self.assertTrue(
+            self.dispatcher.dispatch(
+                SignalMessage("/top", "org.storage.Manager", "Stopped", ())
+            )
+        )
+        self.assertFalse(
+            self.dispatcher.dispatch(
+                SignalMessage("/top", "org.storage.Manager", "Started", ())
+            )
+        )
+        self.assertEqual(len(self.received), 2)
+
+    def test_errors(self):
+        """
+        Verify that unknown signals and bad arguments are reported.
+        """
+        with self.assertRaises(DbusClientUnknownSignalError):
+            self.dispatcher.connect("org.Other", "Changed", print)
+        with self.assertRaises(DbusClientUnknownSignalError):
+            self.dispatcher.signature("org.storage.Manager", "Started")
+
+        self.dispatcher.connect("org.storage.Manager", "PoolAdded", print)
+        with self.assertRaises(DbusClientArgumentError) as context:
+            self.dispatcher.dispatch(
+                SignalMessage("/top", "org.storage.Manager", "PoolAdded", ("/p",))
+            )
+        self.assertEqual(context.exception.arg_names, ["object_path", 1])
+
+
+class PropertyFetcherTestCase(unittest.TestCase):
+    """
+    Test reading properties of live objects through a fake transport.
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        self.pools = {
+            "/p0": {"Name": "p0", "Size": 1024},
+            "/p1": {"Name": "p1", "Size": 2048},
+        }
+        self.transport = FakeTransport(
+            {
+                ("org.freedesktop.DBus.Properties", "GetAll"): lambda op, _: (
+                    dict(self.pools[op]),
+                )
+            }
+        )
+        self.fetcher = PropertyFetcher(self.transport, ttl=1.0, clock=self.clock)
+        self.klass = property_fetcher_class("Pool", _POOL_SPEC)
+
+    def clock(self):
+        """
+        A fake clock.
+        """
+        return self.now
+
+    def test_coalescing(self):
+        """
+        Verify that concurrent reads of an object share a single GetAll and
+        that reads of many objects are pipelined.
+        """
+        replies = [
+            self.fetcher.fetch(op, "org.storage.Pool")
+            for op in ["/p0", "/p1", "/p0", "/p1"]
+        ]
+        self.assertIs(replies[0], replies[2])
+
+        pools = [self.klass(self.fetcher, op) for op in ["/p0", "/p1"]]
+        self.assertEqual([pool.Name() for pool in pools], ["p0", "p1"])
+        self.assertEqual([pool.Size() for pool in pools], [1024, 2048])
+        self.assertEqual(replies[3].result(), {"Name": "p1", "Size": 2048})
+
+        self.assertEqual(len(self.transport.calls), 2)
+        self.assertEqual(self.transport.round_trips, 1)
+        self.assertEqual(self.transport.calls[0][1].args, ("org.storage.Pool",))
+
+        with self.assertRaises(DbusClientMissingPropertyError):
+            pools[0].Encrypted()
+
+    def test_expiry(self):
+        """
+        Verify that cached values are used only until they expire or are
+        invalidated.
+        """
+        pool = self.klass(self.fetcher, "/p0")
+        self.assertEqual(pool.Name(), "p0")
+
+        self.pools["/p0"]["Name"] = "renamed"
+        self.now = 0.5
+        self.assertEqual(pool.Name(), "p0")
+        self.assertEqual(len(self.transport.calls), 1)
+
+        self.now = 1.5
+        self.assertEqual(pool.Name(), "renamed")
+        self.assertEqual(len(self.transport.calls), 2)
+
+        self.fetcher.invalidate(interface_name="org.Other")
+        self.fetcher.invalidate(object_path="/p1")
+        self.assertEqual(pool.Name(), "renamed")
+        self.assertEqual(len(self.transport.calls), 2)
+
+        self.fetcher.invalidate()
+        self.assertEqual(pool.Name(), "renamed")
+        self.assertEqual(len(self.transport.calls), 3)
+
+    def test_failure(self):
+        """
+        Verify that a failed call is reported and not cached.
+        """
+        pool = self.klass(self.fetcher, "/p2")
+        with self.assertRaises(KeyError):
+            pool.Name()
+
+        self.pools["/p2"] = {"Name": "p2"}
+        self.assertEqual(pool.Name(), "p2")
+
+    def test_old_reply(self):
+        """
+        Verify that asking an old reply for its result again neither caches
+        its stale value afresh nor issues another call, and that it repeats
+        its error if it failed.
+        """
+        reply = self.fetcher.fetch("/p0", "org.storage.Pool")
+        self.assertEqual(reply.result(), {"Name": "p0", "Size": 1024})
+
+        self.pools["/p0"]["Name"] = "renamed"
+        self.now = 5.0
+        self.assertEqual(reply.result()["Name"], "p0")
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertEqual(
+            self.fetcher.get_all("/p0", "org.storage.Pool")["Name"], "renamed"
+        )
+        self.assertEqual(len(self.transport.calls), 2)
+
+        failed = self.fetcher.fetch("/p2", "org.storage.Pool")
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                failed.result()
+        self.assertEqual(len(self.transport.calls), 3)
+
+    def test_invalidate_in_flight(self):
+        """
+        Verify that a reply to a call which was in flight when its entry was
+        invalidated is not cached, and that a later read issues a new call.
+        """
+        old = self.fetcher.fetch("/p0", "org.storage.Pool")
+        other = self.fetcher.fetch("/p1", "org.storage.Pool")
+        self.fetcher.invalidate(object_path="/p0")
+        self.pools["/p0"]["Name"] = "renamed"
+
+        self.assertEqual(old.result()["Name"], "renamed")
+        self.pools["/p0"]["Name"] = "again"
+        new = self.fetcher.fetch("/p0", "org.storage.Pool")
+        self.assertIsNot(new, old)
+        self.assertEqual(new.result()["Name"], "again")
+        self.assertEqual(len(self.transport.calls), 3)
+
+        other.result()
+        self.fetcher.get_all("/p1", "org.storage.Pool")
+        self.assertEqual(len(self.transport.calls), 3)
+
+
+class ValidationTestCase(unittest.TestCase):
+    """
+    Test validation of GMO data against interface specifications.
+    """
+
+    def test_report(self):
+        """
+        Verify that every missing property is reported, and that only the
+        interfaces each object implements are checked.
+        """
+        gmo = {
+            "/p0": {
+                "org.storage.Pool": {"Name": "p0", "Size": 1, "Encrypted": False},
+                "org.storage.Pool.r1": {"Uuid": "0"},
+            },
+            "/p1": {"org.storage.Pool": {"Name": "p1"}},
+            "/p2": {"org.storage.Pool.r1": {}},
+            "/fs": {"org.storage.Filesystem": {}},
+        }
+        report = validate_gmo(gmo, [_POOL_SPEC, _POOL_R1_SPEC])
+        self.assertFalse(report.valid)
+        self.assertEqual(report.missing_interfaces, {})
+        self.assertEqual(
+            report.missing_properties,
+            {
+                ("/p1", "org.storage.Pool"): ["Encrypted", "Size"],
+                ("/p2", "org.storage.Pool.r1"): ["Uuid"],
+            },
+        )
+
+        with self.assertRaises(DbusClientValidationError) as context:
+            ValidatedGMO(gmo, [_POOL_SPEC, _POOL_R1_SPEC])
+        self.assertIs(context.exception.report.valid, False)
+        self.assertIn(
+            'Object "/p1" is missing properties of interface "org.storage.Pool": '
+            "Encrypted, Size",
+            str(context.exception),
+        )
+
+        gmo["/p1"]["org.storage.Pool"].update(Size=2, Encrypted=True)
+        gmo["/p2"]["org.storage.Pool.r1"]["Uuid"] = "2"
+        self.assertTrue(validate_gmo(gmo, [_POOL_SPEC, _POOL_R1_SPEC]).valid)
+
+    def test_required(self):
+        """
+        Verify that interfaces required to be implemented together are
+        reported missing from objects which implement only some of them.
+        """
+        gmo = {
+            "/p0": {
+                "org.storage.Pool": {"Name": "p0", "Size": 1, "Encrypted": False},
+                "org.storage.Pool.r1": {"Uuid": "0"},
+            },
+            "/p1": {"org.storage.Pool": {"Name": "p1", "Size": 2, "Encrypted": True}},
+            "/p2": {"org.storage.Pool.r1": {"Uuid": "2"}},
+            "/fs": {"org.storage.Filesystem": {}},
+        }
+        specs = [_POOL_SPEC, _POOL_R1_SPEC]
+        required = [["org.storage.Pool", "org.storage.Pool.r1"]]
+
+        report = validate_gmo(gmo, specs, required=required)
+        self.assertEqual(
+            report.missing_interfaces,
+            {"/p1": ["org.storage.Pool.r1"], "/p2": ["org.storage.Pool"]},
+        )
+        self.assertEqual(report.missing_properties, {})
+        self.assertIn(
+            'Object "/p2" is missing interfaces: org.storage.Pool', str(report)
+        )
+
+        with self.assertRaises(DbusClientValidationError):
+            ValidatedGMO(gmo, specs, required=required)
+
+        del gmo["/p1"]
+        del gmo["/p2"]
+        self.assertTrue(validate_gmo(gmo, specs, required=required).valid)
+
+        with self.assertRaises(DbusClientGenerationError):
+            validate_gmo(gmo, specs, required=[["org.storage.Filesystem"]])
+        with self.assertRaises(DbusClientGenerationError):
+            ValidatedGMO(gmo, specs, required=[["org.storage.Filesystem"]])
+
+    def test_unchecked(self):
+        """
+        Verify that classes and queries handed out after validation give the
+        same results as their checked counterparts.
+        """
+        gmo = {
+            f"/p{i}": {
+                "org.storage.Pool": {"Name": f"p{i}", "Size": i, "Encrypted": False}
+            }
+            for i in range(3)
+        }
+        gmo["/fs"] = {"org.storage.Filesystem": {}}
+        validated = ValidatedGMO(gmo, [_POOL_SPEC])
+
+        klass = validated.managed_object_class("Pool", "org.storage.Pool")
+        self.assertEqual(klass(gmo["/p1"]).Size(), 1)
+
+        self.assertEqual(
+            list(validated.query("org.storage.Pool", {"Name": "p2"}).search(gmo)),
+            list(mo_query_builder(_POOL_SPEC)({"Name": "p2"}).search(gmo)),
+        )
+
+        with self.assertRaises(DbusClientUnknownSearchPropertiesError):
+            validated.query("org.storage.Pool", {"Uuid": "0"})
+        with self.assertRaises(DbusClientGenerationError):
+            validated.query("org.storage.Filesystem")
+        with self.assertRaises(DbusClientGenerationError):
+            validated.managed_object_class("Filesystem", "org.storage.Filesystem")
+
+
+class MemoryTestCase(unittest.TestCase):
+    """
+    Test memory footprint reporting.
+    """
+
+    def setUp(self):
+        self.gmo = {
+            f"/p{i}": {
+                "org.storage.Pool": {"Name": f"p{i}", "Size": i, "Encrypted": False},
+                "org.storage.Pool.r1": {"Uuid": str(i) * 32},
+            }
+            for i in range(10)
+        }
+
+    def test_gmo(self):
+        """
+        Verify that the breakdown by interface accounts for the whole result.
+        """
+        report = gmo_sizeof(self.gmo)
+        self.assertEqual(report.total, deep_sizeof(self.gmo))
+        self.assertEqual(report.total, report.objects + sum(report.interfaces.values()))
+        self.assertEqual(
+            sorted(report.interfaces), ["org.storage.Pool", "org.storage.Pool.r1"]
+        )
+
+    def test_wrappers(self):
+        """
+        Verify that the memory used by classes, instances and queries can be
+        separated from the memory used by the data they wrap.
+        """
+        klass = managed_object_class("Pool", _POOL_SPEC)
+        self.assertGreater(
+            class_sizeof(klass),
+            class_sizeof(managed_object_class("Pool", _POOL_R1_SPEC)),
+        )
+
+        obj = klass(self.gmo["/p0"])
+        self.assertLess(
+            deep_sizeof(obj, exclude=[self.gmo]), deep_sizeof(self.gmo["/p0"])
+        )
+
+        query = mo_query_builder(_POOL_SPEC)({"Name": "p0"})
+        self.assertGreater(deep_sizeof(query), 0)
+
+        (result, size) = traced_allocation(lambda: list(query.search(self.gmo)))
+        self.assertEqual(len(result), 1)
+        self.assertGreater(size, 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        tracemalloc.start()
+        try:
+            (result, size) = traced_allocation(dict.fromkeys, range(100))
+            self.assertEqual(len(result), 100)
+            self.assertGreater(size, 0)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_traversal(self):
+        """
+        Verify that slots, defaults and closures are traversed.
+        """
+
+        class Base:
+            """
+            A class with slots.
+            """
+
+            __slots__ = ("first", "second")
+
+        class Derived(Base):
+            """
+            A class with more slots.
+            """
+
+            __slots__ = ("third",)
+
+        obj = Derived()
+        obj.first = "x" * 100
+        obj.third = "y" * 100
+        self.assertGreater(deep_sizeof(obj), 200)
+
+        class Single:
+            """
+            A class which names its only slot by a str.
+            """
+
+            __slots__ = "payload"  # noqa: PLC0205
+
+        single = Single()
+        single.payload = "v" * 100
+        self.assertGreater(deep_sizeof(single), 100)
+
+        def func(value="z" * 100, *, other="w" * 100):
+            return (value, other, obj)
+
+        self.assertGreater(deep_sizeof(func), deep_sizeof(obj) + 200)
+
+
+class BulkQueryTestCase(unittest.TestCase):
+    """
+    Test resolving many values in one pass.
+    """
+
+    def setUp(self):
+        self.gmo = {
+            f"/p{i}": {"org.storage.Pool": {"Name": f"p{i % 5}", "Size": [i]}}
+            for i in range(10)
+        }
+        self.gmo["/fs"] = {"org.storage.Filesystem": {"Name": "p0"}}
+        self.builder = mo_bulk_query_builder(_POOL_SPEC)
+
+    def test_search(self):
+        """
+        Verify that matches are grouped by value and missing values reported.
+        """
+        result = self.builder("Name", ["p1", "p3", "p1", "q"]).search(self.gmo)
+        self.assertEqual(
+            {
+                value: [op for (op, _) in found]
+                for (value, found) in result.matches.items()
+            },
+            {"p1": ["/p1", "/p6"], "p3": ["/p3", "/p8"]},
+        )
+        self.assertEqual(result.missing, ["q"])
+
+        result = self.builder("Size", [(1,)]).search(self.gmo)
+        self.assertEqual(result.matches, {})
+        self.assertEqual(result.missing, [(1,)])
+
+    def test_errors(self):
+        """
+        Verify that duplicate matches, unknown properties and missing
+        properties are reported.
+        """
+        with self.assertRaises(DbusClientBulkUniqueResultError) as context:
+            self.builder("Name", ["p1", "p2"]).require_unique_match().search(self.gmo)
+        self.assertEqual(sorted(context.exception.results), ["p1", "p2"])
+        self.assertEqual(context.exception.property_name, "Name")
+
+        gmo = {f"/p{i}": {"org.storage.Pool": {"Name": f"p{i}"}} for i in range(3)}
+        result = self.builder("Name", ["p1", "p9"]).require_unique_match().search(gmo)
+        self.assertEqual(result.matches, {"p1": [("/p1", gmo["/p1"])]})
+
+        with self.assertRaises(DbusClientUnknownSearchPropertiesError):
+            self.builder("Uuid", [])
+
+        with self.assertRaises(DbusClientMissingSearchPropertiesError):
+            self.builder("Encrypted", [True]).search(self.gmo)
+
+
+class OrderingTestCase(unittest.TestCase):
+    """
+    Test ordering, offset and limit of queries.
+    """
+
+    def setUp(self):
+        self.gmo = {
+            f"/p{i}": {
+                "org.storage.Pool": {
+                    "Name": f"p{i}",
+                    "Size": (i * 7) % 10,
+                    "Encrypted": i % 2 == 0,
+                }
+            }
+            for i in range(10)
+        }
+        self.gmo["/fs"] = {"org.storage.Filesystem": {}}
+        self.builder = mo_query_builder(_POOL_SPEC)
+
+    def names(self, query):
+        """
+        The names of the pools found by a query.
+        """
+        return [
+            data["org.storage.Pool"]["Name"] for (_, data) in query.search(self.gmo)
+        ]
+
+    def test_order(self):
+        """
+        Verify that ordering with and without a limit gives the same result
+        as sorting every match.
+        """
+        expected = sorted(
+            (data["org.storage.Pool"]["Size"], data["org.storage.Pool"]["Name"])
+            for data in self.gmo.values()
+            if "org.storage.Pool" in data
+        )
+        expected = [name for (_, name) in expected]
+
+        self.assertEqual(self.names(self.builder().order_by("Size", "Name")), expected)
+        self.assertEqual(
+            self.names(self.builder().order_by("Size").offset(2).limit(3)),
+            expected[2:5],
+        )
+        self.assertEqual(
+            self.names(self.builder().order_by("Size", descending=True).limit(2)),
+            expected[::-1][:2],
+        )
+        self.assertEqual(
+            self.names(
+                self.builder({"Encrypted": True}).order_by("Name", descending=True)
+            ),
+            ["p8", "p6", "p4", "p2", "p0"],
+        )
+        self.assertEqual(len(self.names(self.builder().order_by())), 10)
+
+    def test_limit(self):
+        """
+        Verify that an unordered limit stops evaluation early.
+        """
+        self.assertEqual(self.names(self.builder().offset(8)), ["p8", "p9"])
+        self.assertEqual(self.names(self.builder().offset(1).limit(2)), ["p1", "p2"])
+
+        self.gmo["/p5"]["org.storage.Pool"] = {}
+        self.assertEqual(self.names(self.builder({"Size": 0}).limit(1)), ["p0"])
+
+    def test_errors(self):
+        """
+        Verify that unknown, missing and incomparable sort keys are reported.
+        """
+        with self.assertRaises(DbusClientUnknownSearchPropertiesError):
+            self.builder().order_by("Uuid")
+
+        self.assertEqual(
+            len(list(GMOQuery("org.storage.Pool", {}).order_by("Uuid").search({}))), 0
+        )
+
+        del self.gmo["/p3"]["org.storage.Pool"]["Size"]
+        with self.assertRaises(DbusClientMissingSearchPropertiesError):
+            self.builder().order_by("Size").limit(1).search(self.gmo)
+
+        gmo = {
+            "/p0": {"org.storage.Pool": {"Name": None}},
+            "/p1": {"org.storage.Pool": {"Name": "x"}},
+        }
+        for query in (
+            GMOQuery("org.storage.Pool", {}).order_by("Name"),
+            GMOQuery("org.storage.Pool", {}).order_by("Name").limit(1),
+        ):
+            with self.assertRaises(DbusClientOrderingError) as context:
+                list(query.search(gmo))
+            self.assertEqual(
+                (context.exception.interface_name, context.exception.property_names),
+                ("org.storage.Pool", ["Name"]),
+            )
+
+    def test_bad_options(self):
+        """
+        Verify that negative and non-int offsets and limits are rejected,
+        with or without ordering.
+        """
+        for query in (self.builder(), self.builder().order_by("Size")):
+            for value in (-1, 1.5, "2", True):
+                with self.assertRaises(DbusClientQueryOptionError) as context:
+                    query.limit(value)
+                self.assertEqual(
+                    (context.exception.option_name, context.exception.value),
+                    ("limit", value),
+                )
+                with self.assertRaises(DbusClientQueryOptionError):
+                    query.offset(value)
+            query.offset(0).limit(None)
+            self.assertEqual(len(list(query.search(self.gmo))), 10)
+
+
+class AggregateTestCase(unittest.TestCase):
+    """
+    Test count and exists aggregates, with and without a snapshot.
+    """
+
+    def setUp(self):
+        self.gmo = {
+            f"/p{i}": {
+                "org.storage.Pool": {
+                    "Name": f"p{i}",
+                    "Size": i % 3,
+                    "Encrypted": i % 2 == 0,
+                }
+            }
+            for i in range(10)
+        }
+        self.gmo.update((f"/fs{i}", {"org.storage.Filesystem": {}}) for i in range(10))
+        self.builder = mo_query_builder(_POOL_SPEC)
+
+    def test_aggregates(self):
+        """
+        Verify that aggregates agree with search on both plain results and
+        snapshots.
+        """
+        snapshot = GMOSnapshot(self.gmo)
+        for gmo in [self.gmo, snapshot]:
+            for props in [{}, {"Encrypted": True}, {"Size": 2}, {"Size": 3}]:
+                query = self.builder(props)
+                matches = list(query.search(gmo))
+                self.assertEqual(query.count(gmo), len(matches))
+                self.assertEqual(query.exists(gmo), matches != [])
+
+            self.assertEqual(self.builder().count_by("Size", gmo), {0: 4, 1: 3, 2: 3})
+            self.assertEqual(
+                self.builder({"Encrypted": False}).count_by("Encrypted", gmo),
+                {False: 5},
+            )
+
+        self.assertEqual(len(snapshot), 20)
+        self.assertEqual(sorted(snapshot)[0], "/fs0")
+        self.assertIs(snapshot["/p0"], self.gmo["/p0"])
+        self.assertIs(
+            snapshot.objects_with_interface("org.storage.Pool"),
+            snapshot.objects_with_interface("org.storage.Pool"),
+        )
+
+    def test_errors(self):
+        """
+        Verify that unknown and missing grouping properties are reported.
+        """
+        with self.assertRaises(DbusClientUnknownSearchPropertiesError):
+            self.builder().count_by("Uuid", self.gmo)
+
+        self.assertEqual(GMOQuery("org.storage.Pool", {}).count_by("Uuid", {}), {})
+
+        del self.gmo["/p3"]["org.storage.Pool"]["Size"]
+        with self.assertRaises(DbusClientMissingSearchPropertiesError):
+            self.builder().count_by("Size", self.gmo)
+
+
+class _Int(int):
+    """
+    A subclass of a builtin type, like the types of dbus-python.
+    """
+
+
+class Boolean(int):
+    """
+    A subclass of int which represents a boolean, like dbus.Boolean.
+    """
+
+
+# The Python and marshal versions which snapshots and recordings record.
+_ENCODING = struct.pack(
+    "<BBH", sys.version_info[0], sys.version_info[1], marshal.version
+)
+
+
+class MappedSnapshotTestCase(unittest.TestCase):
+    """
+    Test the memory-mapped on-disk snapshot format.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "gmo.snap")
+        self.gmo = {
+            f"/p{i}": {
+                "org.storage.Pool": {
+                    "Name": f"p{i}",
+                    "Size": _Int(i % 3),
+                    "Encrypted": Boolean(i % 2 == 0),
+                },
+                "org.storage.Pool.r1": {
+                    "Uuid": bytes([i]) * 16,
+                    "Devices": [("/dev/a", 1.5), ("/dev/b", None)],
+                    "Stats": {"reads": [i]},
+                },
+            }
+            for i in range(10)
+        }
+        self.gmo["/fs"] = {"org.storage.Filesystem": {}}
+        self.gmo["/empty"] = {}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """
+        Verify that the snapshot reads back the same data and that queries
+        over it find the same objects.
+        """
+        write_mapped_snapshot(self.gmo, self.file_path)
+        with MappedGMOSnapshot(self.file_path) as snapshot:
+            self.assertEqual(list(snapshot), list(self.gmo))
+            self.assertEqual(len(snapshot), len(self.gmo))
+            self.assertEqual(
+                {
+                    op: {name: dict(table) for (name, table) in data.items()}
+                    for (op, data) in snapshot.items()
+                },
+                self.gmo,
+            )
+            self.assertNotIn("org.storage.Pool", snapshot["/fs"])
+            self.assertEqual(len(snapshot["/p0"]), 2)
+            self.assertEqual(snapshot.objects_with_interface("org.Other"), ())
+
+            query = mo_query_builder(_POOL_SPEC)({"Size": 1})
+            self.assertEqual(
+                [op for (op, _) in query.search(snapshot)],
+                [op for (op, _) in query.search(self.gmo)],
+            )
+            self.assertEqual(query.count(snapshot), 3)
+
+    def test_lazy(self):
+        """
+        Verify that a query decodes only the tables and values it reads.
+        """
+        write_mapped_snapshot(self.gmo, self.file_path)
+        with MappedGMOSnapshot(self.file_path) as snapshot:
+            query = mo_query_builder(_POOL_SPEC)({"Encrypted": True})
+            self.assertTrue(query.exists(snapshot))
+
+            table = snapshot["/p0"]["org.storage.Pool"]
+            self.assertEqual(list(table._values), ["Encrypted"])
+            self.assertEqual(len(table), 3)
+            self.assertNotIn("Uuid", table)
+            with self.assertRaises(KeyError):
+                table["Uuid"]
+
+    def test_errors(self):
+        """
+        Verify that bad values and bad files are reported.
+        """
+        with self.assertRaises(DbusClientSnapshotFormatError):
+            write_mapped_snapshot(
+                {"/p0": {"org.storage.Pool": {"Name": object()}}}, self.file_path
+            )
+
+        for contents in [
+            b"",
+            b"x" * 64,
+            b"DCGSNAP\x02" + _ENCODING + b"\xff" * 16,
+            b"DCGSNAP\x02" + struct.pack("<BBH", 2, 7, 2) + b"\0" * 16,
+        ]:
+            with open(self.file_path, "wb") as handle:
+                handle.write(contents)
+            with self.assertRaises(DbusClientSnapshotFormatError) as context:
+                MappedGMOSnapshot(self.file_path)
+            self.assertEqual(context.exception.file_path, self.file_path)
+        self.assertIn("Python 2.7 with marshal version 2", str(context.exception))
+
+        for directory in [((1, 2, 3), {}), ((), []), (([], ()), {})]:
+            encoded = marshal.dumps(directory)
+            with open(self.file_path, "wb") as handle:
+                handle.write(
+                    b"DCGSNAP\x02"
+                    + _ENCODING
+                    + struct.pack("<QQ", 28, len(encoded))
+                    + encoded
+                )
+            with self.assertRaises(DbusClientSnapshotFormatError):
+                MappedGMOSnapshot(self.file_path)
+
+    def test_corrupt(self):
+        """
+        Verify that a table or value which can not be decoded is reported
+        when it is read.
+        """
+        gmo = {"/p0": {"org.storage.Pool": {"Name": "n" * 20}}}
+        write_mapped_snapshot(gmo, self.file_path)
+        with open(self.file_path, "rb") as handle:
+            contents = handle.read()
+        # The first table follows the 28-byte file header, and the encoded
+        # property names follow its 4-byte length. b"N" encodes None.
+        for offset, garbage in [
+            (32, b"\xff"),
+            (32, b"N"),
+            (contents.index(b"n" * 20) - 2, b"\xff"),
+        ]:
+            with open(self.file_path, "wb") as handle:
+                handle.write(contents[:offset] + garbage + contents[offset + 1 :])
+            with MappedGMOSnapshot(self.file_path) as snapshot:
+                with self.assertRaises(DbusClientSnapshotFormatError) as context:
+                    snapshot["/p0"]["org.storage.Pool"]["Name"]
+            self.assertEqual(context.exception.file_path, self.file_path)
+
+    def test_boolean(self):
+        """
+        Verify that a subclass of int named Boolean is written as a bool.
+        """
+        write_mapped_snapshot(self.gmo, self.file_path)
+        with MappedGMOSnapshot(self.file_path) as snapshot:
+            self.assertIs(snapshot["/p0"]["org.storage.Pool"]["Encrypted"], True)
+            self.assertIs(type(snapshot["/p0"]["org.storage.Pool"]["Size"]), int)
+
+
+class _FakeClock:
+    """
+    A clock which advances only when told to, or when slept on.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ReplayTestCase(unittest.TestCase):
+    """
+    Test recording and replaying GetManagedObjects() results and changes.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "gmo.rec")
+        self.clock = _FakeClock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _record(self):
+        """
+        Record a result and a change of every kind, one second apart.
+        """
+        with GMORecorder(self.file_path, clock=self.clock) as recorder:
+            recorder.record_gmo(
+                {"/p0": {"org.storage.Pool": {"Name": "p0", "Size": _Int(1)}}}
+            )
+            self.clock.now += 1
+            recorder.interfaces_added(
+                "/p1", {"org.storage.Pool": {"Name": "p1", "Size": 2}}
+            )
+            self.clock.now += 1
+            recorder.properties_changed(
+                "/p0", "org.storage.Pool", {"Name": "p2"}, ["Size"]
+            )
+            self.clock.now += 1
+            recorder.interfaces_removed("/p1", ["org.storage.Pool"])
+
+    def test_replay(self):
+        """
+        Verify that every change is applied in order, at the requested pace,
+        and that the latency of each operation is reported.
+        """
+        self._record()
+        self.clock = _FakeClock()
+        seen = []
+
+        def names(gmo):
+            self.clock.now += 0.25
+            seen.append(
+                sorted(
+                    (op, dict(data["org.storage.Pool"])) for (op, data) in gmo.items()
+                )
+            )
+
+        query = mo_query_builder(_POOL_SPEC)({"Name": "p2"})
+        report = replay(
+            self.file_path,
+            {"names": names, "count": query.count},
+            speed=2.0,
+            snapshot=GMOSnapshot,
+            clock=self.clock,
+            sleep=self.clock.sleep,
+        )
+
+        self.assertEqual(
+            seen,
+            [
+                [("/p0", {"Name": "p0", "Size": 1})],
+                [
+                    ("/p0", {"Name": "p0", "Size": 1}),
+                    ("/p1", {"Name": "p1", "Size": 2}),
+                ],
+                [("/p0", {"Name": "p2"}), ("/p1", {"Name": "p1", "Size": 2})],
+                [("/p0", {"Name": "p2"})],
+            ],
+        )
+        self.assertEqual(self.clock.sleeps, [0.25, 0.25, 0.25])
+        self.assertEqual(report.events, 4)
+        self.assertEqual(report.latencies["names"], [0.25] * 4)
+        self.assertEqual(report.summary()["names"], (4, 0.25, 0.25))
+        self.assertEqual(report.summary()["names"].runs, 4)
+        self.assertEqual(report.summary()["count"], (4, 0.0, 0.0))
+
+    def test_state(self):
+        """
+        Verify that a replayed result changes like a dict, without changing
+        the results handed out before it.
+        """
+        expected = {f"/p{i}": {"I": {"N": i}} for i in range(16)}
+        state = _ReplayState(dict(expected))
+        views = [(state, dict(expected))]
+        for op, object_path in [
+            ("remove", "/p1"),
+            ("replace", "/p1"),
+            ("replace", "/new"),
+            ("remove", "/new"),
+            ("remove", "/missing"),
+            ("replace", "/p2"),
+            ("replace", "/p3"),
+            ("replace", "/p4"),
+            ("replace", "/p5"),
+            ("remove", "/p6"),
+        ]:
+            if op == "remove":
+                state = state.remove(object_path)
+                expected.pop(object_path, None)
+                with self.assertRaises(KeyError):
+                    state[object_path]
+            else:
+                state = state.replace(object_path, {"I": {"N": op}})
+                expected[object_path] = {"I": {"N": op}}
+            views.append((state, dict(expected)))
+
+        for view, contents in views:
+            self.assertEqual(list(view.items()), list(contents.items()))
+            self.assertEqual(len(view), len(contents))
+
+    def test_speed(self):
+        """
+        Verify that a speed which is not positive is rejected.
+        """
+        self._record()
+        for speed in (0, -1.0):
+            with self.assertRaises(DbusClientReplayOptionError) as context:
+                replay(self.file_path, {}, speed=speed)
+            self.assertEqual(context.exception.option_name, "speed")
+            self.assertEqual(context.exception.value, speed)
+
+    def test_unpaced(self):
+        """
+        Verify that a replay without a speed does not pause, and that a
+        replay with no operations still counts events.
+        """
+        self._record()
+        report = replay(self.file_path, {}, speed=None, sleep=self.fail)
+        self.assertEqual(report.events, 4)
+        self.assertEqual(report.summary(), {})
+        report = replay(self.file_path, {"op": len}, speed=None)
+        self.assertEqual(len(report.latencies["op"]), 4)
+
+    def test_errors(self):
+        """
+        Verify that bad values and bad files are reported.
+        """
+        with GMORecorder(self.file_path) as recorder:
+            with self.assertRaises(DbusClientSnapshotFormatError):
+                recorder.properties_changed("/p0", "org.storage.Pool", {"A": object()})
+
+        for contents in [
+            b"",
+            b"DCGREC\x00\x02",
+            b"DCGREC\x00\x02" + struct.pack("<BBH", 2, 7, 2),
+            b"DCGREC\x00\x02" + _ENCODING + b"\x01",
+            b"DCGREC\x00\x02" + _ENCODING + b"\x04\x00\x00\x00x",
+        ] + [
+            b"DCGREC\x00\x02"
+            + _ENCODING
+            + struct.pack("<I", len(marshal.dumps(record)))
+            + marshal.dumps(record)
+            for record in [
+                ["gmo", 0.0, {}],
+                (),
+                ("gmo", 0.0),
+                ("properties_changed", 0.0, "/p0", "org.storage.Pool", {}),
+                ("unknown", 0.0, "/p0", {}),
+                ([], 0.0, {}),
+            ]
+        ]:
+            with open(self.file_path, "wb") as handle:
+                handle.write(contents)
+            with self.assertRaises(DbusClientSnapshotFormatError) as context:
+                replay(self.file_path, {}, speed=None)
+            self.assertEqual(context.exception.file_path, self.file_path)
+
+
+class SnapshotHolderTestCase(unittest.TestCase):
+    """
+    Test publishing snapshots to concurrent readers.
+    """
+
+    def test_publish(self):
+        """
+        Verify that published results are copied, versioned, and unaffected
+        by later publications.
+        """
+        klass = managed_object_class("Pool", _POOL_SPEC)
+        holder = GMOSnapshotHolder()
+        self.assertEqual((len(holder.current()), holder.current().version), (0, 0))
+
+        gmo = {"/p0": {"org.storage.Pool": {"Name": "p0"}}}
+        first = holder.publish(gmo)
+        pool = klass(first["/p0"])
+        gmo["/p0"]["org.storage.Pool"]["Name"] = "changed"
+        self.assertEqual(pool.Name(), "p0")
+
+        second = holder.update(lambda current: {**current, "/p1": {}})
+        self.assertIs(holder.current(), second)
+        self.assertEqual((first.version, second.version), (1, 2))
+        self.assertEqual(list(first), ["/p0"])
+        self.assertEqual(list(second), ["/p0", "/p1"])
+
+        third = holder.publish(gmo, copy=False)
+        self.assertIs(third["/p0"], gmo["/p0"])
+        self.assertEqual(pool.Name(), "p0")
+
+    def test_concurrent(self):
+        """
+        Verify that readers always see a consistent snapshot while a writer
+        publishes new ones.
+        """
+        query = mo_query_builder(_POOL_SPEC)({})
+        holder = GMOSnapshotHolder()
+        failures = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                snapshot = holder.current()
+                sizes = {
+                    data["org.storage.Pool"]["Size"]
+                    for (_, data) in query.search(snapshot)
+                }
+                if sizes not in (set(), {snapshot.version}):
+                    failures.append((snapshot.version, sizes))
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for version in range(1, 200):
+            holder.publish(
+                {
+                    f"/p{i}": {"org.storage.Pool": {"Name": "", "Size": version}}
+                    for i in range(20)
+                },
+                copy=False,
+            )
+        done.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(holder.current().version, 199)
+
+
+class CompositeTestCase(unittest.TestCase):
+    """
+    Test classes which wrap several interfaces of one object.
+    """
+
+    def setUp(self):
+        self.data = {
+            "org.storage.Pool": {"Name": "p0", "Size": 2},
+            "org.storage.Pool.r1": {"Uuid": "u0"},
+        }
+
+    def test_merged(self):
+        """
+        Verify that getters of every interface are available.
+        """
+        klass = composite_managed_object_class("Pool", [_POOL_SPEC, _POOL_R1_SPEC])
+        pool = klass(self.data)
+        self.assertEqual((pool.Name(), pool.Size(), pool.Uuid()), ("p0", 2, "u0"))
+        with self.assertRaises(DbusClientMissingPropertyError):
+            pool.Encrypted()
+        with self.assertRaises(DbusClientMissingInterfaceError):
+            klass({"org.storage.Pool": {}})
+
+    def test_optional(self):
+        """
+        Verify that only required interfaces must be present.
+        """
+        klass = composite_managed_object_class(
+            "Pool",
+            [_POOL_SPEC, _POOL_R1_SPEC],
+            required=["org.storage.Pool"],
+            prefixes={"org.storage.Pool.r1": "r1_"},
+        )
+        pool = klass({"org.storage.Pool": self.data["org.storage.Pool"]})
+        self.assertEqual(pool.Name(), "p0")
+        self.assertFalse(hasattr(pool, "Uuid"))
+        with self.assertRaises(DbusClientMissingInterfaceError) as context:
+            pool.r1_Uuid()
+        self.assertEqual(context.exception.interface_name, "org.storage.Pool.r1")
+        self.assertEqual(klass(self.data).r1_Uuid(), "u0")
+
+    def test_conflicts(self):
+        """
+        Verify that conflicting getters and unknown interfaces are rejected.
+        """
+        other = ET.fromstring(
+            '<interface name="org.Other"><property name="Name" type="s"/></interface>'
+        )
+        with self.assertRaises(DbusClientGenerationError):
+            composite_managed_object_class("Fail", [_POOL_SPEC, other])
+        composite_managed_object_class(
+            "Pool", [_POOL_SPEC, other], prefixes={"org.Other": "other_"}
+        )
+        with self.assertRaises(DbusClientGenerationError):
+            composite_managed_object_class("Fail", [_POOL_SPEC], required=["org.X"])
+        with self.assertRaises(DbusClientGenerationError):
+            composite_managed_object_class("Fail", [_POOL_SPEC], prefixes={"org.X": ""})
+
+
+class ManagedObjectMapTestCase(unittest.TestCase):
+    """
+    Test lazily wrapping a whole GetManagedObjects() result.
+    """
+
+    def setUp(self):
+        self.klass = managed_object_class("Pool", _POOL_SPEC)
+        self.constructed = []
+
+        def construct(data):
+            self.constructed.append(data)
+            return self.klass(data)
+
+        self.construct = construct
+        self.gmo = {f"/p{i}": {"org.storage.Pool": {"Name": f"p{i}"}} for i in range(4)}
+        self.gmo["/fs"] = {"org.storage.Filesystem": {}}
+
+    def test_lazy(self):
+        """
+        Verify that only objects which implement the interface are present,
+        and that instances are constructed once, when looked up.
+        """
+        for gmo in (self.gmo, GMOSnapshot(self.gmo)):
+            self.constructed.clear()
+            pools = ManagedObjectMap(self.construct, "org.storage.Pool", gmo)
+            self.assertEqual(len(pools), 4)
+            self.assertEqual(list(pools), ["/p0", "/p1", "/p2", "/p3"])
+            self.assertIn("/p1", pools)
+            self.assertNotIn("/fs", pools)
+            self.assertNotIn("/none", pools)
+            self.assertEqual(self.constructed, [])
+
+            self.assertEqual(pools["/p1"].Name(), "p1")
+            self.assertIs(pools["/p1"], pools["/p1"])
+            self.assertEqual(len(self.constructed), 1)
+            with self.assertRaises(KeyError):
+                pools["/fs"]
+            with self.assertRaises(KeyError):
+                pools["/none"]
+
+    def test_updated(self):
+        """
+        Verify that instances are reused for unchanged objects only.
+        """
+        pools = ManagedObjectMap(self.construct, "org.storage.Pool", self.gmo)
+        (p0, p1) = (pools["/p0"], pools["/p1"])
+
+        gmo = dict(self.gmo)
+        gmo["/p1"] = {"org.storage.Pool": {"Name": "changed"}}
+        updated = pools.updated(gmo)
+        self.assertIs(updated["/p0"], p0)
+        self.assertIsNot(updated["/p1"], p1)
+        self.assertEqual(updated["/p1"].Name(), "changed")
+        self.assertEqual(len(self.constructed), 3)
+
+    def test_updated_twice(self):
+        """
+        Verify that instances are reused across an update in which they were
+        not looked up.
+        """
+        pools = ManagedObjectMap(self.construct, "org.storage.Pool", self.gmo)
+        (p0, p1) = (pools["/p0"], pools["/p1"])
+
+        gmo = dict(self.gmo)
+        gmo["/p0"] = {"org.storage.Pool": {"Name": "changed"}}
+        skipped = pools.updated(gmo)
+        self.assertIsNot(skipped["/p0"], p0)
+
+        updated = skipped.updated(dict(gmo))
+        self.assertIs(updated["/p1"], p1)
+        self.assertIs(updated["/p0"], skipped["/p0"])
+        self.assertEqual(len(self.constructed), 3)
+
+        updated = updated.updated(self.gmo)
+        self.assertIsNot(updated["/p0"], p0)
+        self.assertEqual(len(self.constructed), 4)
+
+
+_INTROSPECTION = b"""
+<node>
+  <interface name="org.freedesktop.DBus.Introspectable">
+    <method name="Introspect"><arg name="xml" type="s" direction="out"/></method>
+  </interface>
+  <node name="pool">
+    <interface name="org.storage.Pool">
+      <annotation name="org.example.Deprecated" value="false"/>
+      <method name="Rename"><arg name="name" type="s" direction="in"/></method>
+      <property name="Name" type="s" access="read">
+        <annotation
+          name="org.freedesktop.DBus.Property.EmitsChangedSignal" value="const"/>
+      </property>
+      <property name="Size" type="t" access="read"/>
+      <property name="Encrypted" type="b" access="read"/>
+    </interface>
+    <interface name="org.storage.Pool.r1">
+      <property name="Uuid" type="s" access="read"/>
+    </interface>
+  </node>
+</node>
+"""
+
+
+class ParseSpecsTestCase(unittest.TestCase):
+    """
+    Test incremental extraction of interface specs.
+    """
+
+    def test_extract(self):
+        """
+        Verify that only requested interfaces are extracted, with their
+        properties and annotations.
+        """
+        specs = parse_interface_specs(
+            io.BytesIO(_INTROSPECTION), ["org.storage.Pool", "org.Missing"]
+        )
+        self.assertEqual(list(specs), ["org.storage.Pool"])
+        spec = specs["org.storage.Pool"]
+        self.assertEqual(spec.annotations, (("org.example.Deprecated", "false"),))
+        self.assertEqual(
+            [(p.name, p.type, p.access) for p in spec.properties],
+            [("Name", "s", "read"), ("Size", "t", "read"), ("Encrypted", "b", "read")],
+        )
+        self.assertEqual(
+            spec.properties[0].annotations,
+            (("org.freedesktop.DBus.Property.EmitsChangedSignal", "const"),),
+        )
+        self.assertEqual(spec.properties[1].annotations, ())
+
+        with tempfile.NamedTemporaryFile(suffix=".xml") as handle:
+            handle.write(_INTROSPECTION)
+            handle.flush()
+            self.assertEqual(
+                list(parse_interface_specs(handle.name)),
+                [
+                    "org.freedesktop.DBus.Introspectable",
+                    "org.storage.Pool",
+                    "org.storage.Pool.r1",
+                ],
+            )
+
+    def test_builders(self):
+        """
+        Verify that an extracted spec may be used in place of an element.
+        """
+        specs = parse_interface_specs(io.BytesIO(_INTROSPECTION))
+        gmo = {
+            "/p0": {
+                "org.storage.Pool": {"Name": "p0", "Size": 1, "Encrypted": False},
+                "org.storage.Pool.r1": {"Uuid": "u0"},
+            }
+        }
+        pool = managed_object_class("Pool", specs["org.storage.Pool"])(gmo["/p0"])
+        self.assertEqual(pool.Name(), "p0")
+        query = mo_query_builder(specs["org.storage.Pool"])({"Name": "p0"})
+        self.assertEqual(query.count(gmo), 1)
+        with self.assertRaises(DbusClientUnknownSearchPropertiesError):
+            mo_query_builder(specs["org.storage.Pool"])({"Uuid": "u0"})
+
+        composite = composite_managed_object_class(
+            "Pool", [specs["org.storage.Pool"], specs["org.storage.Pool.r1"]]
+        )
+        self.assertEqual(composite(gmo["/p0"]).Uuid(), "u0")
+        validated = ValidatedGMO(gmo, [specs["org.storage.Pool.r1"]])
+        self.assertEqual(validated.query("org.storage.Pool.r1").count(gmo), 1)
+        self.assertTrue(validate_gmo(gmo, [specs["org.storage.Pool"]]).valid)
+        self.assertTrue(
+            hasattr(property_fetcher_class("Pool", specs["org.storage.Pool"]), "Size")
+        )
+
+    def test_malformed(self):
+        """
+        Verify that unparseable introspection data is reported.
+        """
+        with self.assertRaises(DbusClientGenerationError):
+            parse_interface_specs(io.BytesIO(b"<node><interface"))
+
+
+class SpecCacheTestCase(unittest.TestCase):
+    """
+    Test the persistent cache of extracted interface specs.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, "specs")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _entries(self):
+        return sorted(
+            name for name in os.listdir(self.cache_path) if name.endswith(".json")
+        )
+
+    def test_warm(self):
+        """
+        Verify that a second cache over the same directory reads the specs
+        which the first stored, without parsing.
+        """
+        cache = SpecCache(self.cache_path)
+        specs = cache.specs(_INTROSPECTION, ["org.storage.Pool"])
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        warm = SpecCache(self.cache_path)
+        self.assertEqual(warm.specs(_INTROSPECTION, ["org.storage.Pool"]), specs)
+        self.assertEqual((warm.hits, warm.misses), (1, 0))
+
+        self.assertEqual(len(warm.specs(_INTROSPECTION)), 3)
+        self.assertEqual(len(warm.specs(_INTROSPECTION + b" ")), 3)
+        self.assertEqual((warm.hits, warm.misses), (1, 2))
+        self.assertEqual(len(self._entries()), 3)
+
+    def test_corrupt(self):
+        """
+        Verify that unreadable entries are replaced.
+        """
+        cache = SpecCache(self.cache_path)
+        specs = cache.specs(_INTROSPECTION)
+        (entry,) = self._entries()
+        for contents in [
+            "{",
+            "[]",
+            '{"version": 1}',
+            '{"version": 1, "interfaces": 1}',
+        ]:
+            with open(os.path.join(self.cache_path, entry), "w") as handle:
+                handle.write(contents)
+            self.assertEqual(cache.specs(_INTROSPECTION), specs)
+        self.assertEqual((cache.hits, cache.misses), (0, 5))
+        self.assertEqual(cache.specs(_INTROSPECTION), specs)
+        self.assertEqual(cache.hits, 1)
+
+    def test_evict(self):
+        """
+        Verify that the least recently used entries are evicted.
+        """
+        cache = SpecCache(self.cache_path, max_bytes=1)
+        with open(os.path.join(self.cache_path, "unrelated"), "w") as handle:
+            handle.write("x" * 4096)
+        cache.specs(_INTROSPECTION)
+        self.assertEqual(self._entries(), [])
+        self.assertIn("unrelated", os.listdir(self.cache_path))
+
+        cache = SpecCache(self.cache_path, max_bytes=2000)
+        for number, names in enumerate(
+            [["org.storage.Pool"], ["org.storage.Pool.r1"], []]
+        ):
+            cache.specs(_INTROSPECTION, names)
+            for entry in self._entries():
+                path = os.path.join(self.cache_path, entry)
+                os.utime(path, (number, os.stat(path).st_mtime - 1000))
+        cache.specs(_INTROSPECTION, ["org.storage.Pool"])
+        cache.specs(_INTROSPECTION)
+        self.assertEqual(cache.misses, 4)
+        total = sum(
+            os.path.getsize(os.path.join(self.cache_path, entry))
+            for entry in self._entries()
+        )
+        self.assertLessEqual(total, 2000)
+        cache.specs(_INTROSPECTION, ["org.storage.Pool"])
+        self.assertEqual(cache.hits, 2)
+
+    def test_unwritable(self):
+        """
+        Verify that a cache whose directory has gone still returns specs.
+        """
+        cache = SpecCache(self.cache_path)
+        os.rmdir(self.cache_path)
+        self.assertEqual(len(cache.specs(_INTROSPECTION)), 3)
+        self.assertEqual(cache.misses, 1)
+
+
+class ErrorMessageTestCase(unittest.TestCase):
+    """
+    Test error messages which are formatted when rendered.
+    """
+
+    def setUp(self):
+        self.gmo = {
+            f"/p{i}": {"org.storage.Pool": {"Name": "p", "Size": i}} for i in range(5)
+        }
+
+    def test_messages(self):
+        """
+        Verify that messages and fields are unchanged by deferred formatting.
+        """
+        query = GMOQuery("org.storage.Pool", {"Name": "p"}).require_unique_match()
+        with self.assertRaises(DbusClientUniqueResultError) as context:
+            query.search(self.gmo)
+        error = context.exception
+        self.assertEqual(
+            str(error),
+            "No unique match found for interface org.storage.Pool and "
+            "properties {'Name': 'p'}, found %s" % list(self.gmo.items()),
+        )
+        self.assertEqual(error.args, (str(error),))
+        self.assertEqual(error.result, list(self.gmo.items()))
+        self.assertEqual(repr(error), "DbusClientUniqueResultError(%r)" % str(error))
+
+        with self.assertRaises(DbusClientMissingSearchPropertiesError) as context:
+            list(
+                GMOQuery("org.storage.Pool", {"Uuid": "u", "Name": "p"}).search(
+                    self.gmo
+                )
+            )
+        self.assertEqual(
+            str(context.exception),
+            "Missing properties in data for some object in interface "
+            '"org.storage.Pool": Uuid',
+        )
+        self.assertEqual(context.exception.data_keys, ["Name", "Size"])
+        self.assertIn("Uuid", context.exception.args[0])
+
+        with self.assertRaises(DbusClientMissingSearchPropertiesError) as context:
+            GMOQuery("org.storage.Pool", {}).count_by("Uuid", self.gmo)
+        self.assertTrue(str(context.exception).endswith(": Uuid"))
+
+        error = DbusClientMissingSearchPropertiesError(
+            "given", "org.storage.Pool", [], []
+        )
+        self.assertEqual(str(error), "given")
+        error.args = ("replaced",)
+        self.assertEqual(str(error), "replaced")
+
+        with self.assertRaises(DbusClientMissingSearchPropertiesError) as context:
+            list(GMOQuery("org.storage.Pool", {}).order_by("Uuid").search(self.gmo))
+        self.assertTrue(str(context.exception).endswith(": Uuid"))
+
+    def test_limit(self):
+        """
+        Verify that the number of results in a message can be capped.
+        """
+        query = GMOQuery("org.storage.Pool", {"Name": "p"}).require_unique_match(
+            max_reported_results=2
+        )
+        with self.assertRaises(DbusClientUniqueResultError) as context:
+            query.search(self.gmo)
+        self.assertTrue(
+            str(context.exception).endswith(
+                "found %s (and 3 more)" % list(self.gmo.items())[:2]
+            )
+        )
+        self.assertEqual(len(context.exception.result), 5)
+
+        gmo = {f"/p{i}": {"org.storage.Pool": {"Size": i % 3}} for i in range(9)}
+        bulk = mo_bulk_query_builder(_POOL_SPEC)("Size", [0, 1, 2])
+        with self.assertRaises(DbusClientBulkUniqueResultError) as context:
+            bulk.require_unique_match(max_reported_results=2).search(gmo)
+        self.assertEqual(
+            str(context.exception),
+            'No unique match found for interface "org.storage.Pool" and '
+            'property "Size" for values: 0, 1 (and 1 more)',
+        )
+        with self.assertRaises(DbusClientBulkUniqueResultError) as context:
+            bulk.require_unique_match().search(gmo)
+        self.assertTrue(str(context.exception).endswith("values: 0, 1, 2"))
+
+    def test_fields_copied(self):
+        """
+        Verify that a message formatted later reflects the fields as they were
+        when the exception was constructed.
+        """
+        props = {"Name": "p"}
+        result = list(self.gmo.items())
+        error = DbusClientUniqueResultError(None, "org.storage.Pool", props, result)
+        props["Name"] = "q"
+        result.clear()
+        self.assertIn("{'Name': 'p'}", str(error))
+        self.assertEqual(len(error.result), 5)
+
+        found = [("/p0", {})]
+        error = DbusClientBulkUniqueResultError(
+            None, "org.storage.Pool", "Size", {0: found}
+        )
+        found.clear()
+        self.assertEqual(error.results, {0: [("/p0", {})]})
+
+        error = DbusClientSearchConditionError("given", "org.storage.Pool")
+        self.assertEqual(str(error), "given")
+        self.assertEqual(error.args, ("given",))
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """
+    Test query plans and their estimated and actual counts.
+    """
+
+    def setUp(self):
+        self.gmo = {
+            f"/p{i}": {
+                "org.storage.Pool": {
+                    "Name": f"p{i % 2}",
+                    "Size": i,
+                    "Encrypted": i % 4 == 0,
+                    "Devices": ["/dev/a"],
+                }
+            }
+            for i in range(40)
+        }
+        self.gmo.update({f"/fs{i}": {"org.storage.Filesystem": {}} for i in range(40)})
+
+    def test_scan(self):
+        """
+        Verify the plan of an unordered search of a plain result.
+        """
+        query = GMOQuery(
+            "org.storage.Pool", {"Devices": ["/dev/a"], "Name": "p0", "Encrypted": True}
+        )
+        plan = query.explain(self.gmo)
+        self.assertEqual(plan.access, "full scan with interface check")
+        self.assertEqual(plan.comparisons, ("Encrypted", "Name", "Devices"))
+        self.assertEqual((plan.ordering, plan.termination), ("none", "none"))
+        self.assertEqual(plan.estimated_visited, 80)
+        self.assertEqual(plan.estimated_matches, 20)
+        self.assertEqual(
+            (plan.actual_visited, plan.actual_matches, plan.actual_results),
+            (80, 10, 10),
+        )
+        self.assertIn("actual: visited 80, matched 10, returned 10", str(plan))
+        self.assertIsNone(query.plan(self.gmo).actual_visited)
+        self.assertNotIn("actual", str(query.plan(self.gmo)))
+
+    def test_unique(self):
+        """
+        Verify that a query which requires a unique match is explained even
+        if the search does not find one.
+        """
+        query = GMOQuery("org.storage.Pool", {"Name": "p0"}).require_unique_match()
+        plan = query.explain(self.gmo)
+        self.assertEqual(
+            (plan.actual_visited, plan.actual_matches, plan.actual_results), (80, 20, 0)
+        )
+
+    def test_index_limit(self):
+        """
+        Verify the plan of a limited search of a snapshot.
+        """
+        snapshot = GMOSnapshot(self.gmo)
+        query = GMOQuery("org.storage.Pool", {"Name": "p1"}).offset(2).limit(3)
+        plan = query.explain(snapshot)
+        self.assertEqual(plan.access, "interface index probe")
+        self.assertEqual(plan.termination, "after 5 matches")
+        self.assertEqual(
+            (plan.estimated_visited, plan.estimated_matches, plan.estimated_results),
+            (10, 5, 3),
+        )
+        self.assertEqual(
+            (plan.actual_visited, plan.actual_matches, plan.actual_results), (10, 5, 3)
+        )
+
+        plan = query.order_by("Size").explain(snapshot)
+        self.assertEqual(
+            (plan.ordering, plan.termination), ("bounded heap of 5 matches", "none")
+        )
+        self.assertEqual(plan.actual_visited, 40)
+        plan = query.limit(None).plan(snapshot)
+        self.assertEqual(
+            (plan.ordering, plan.estimated_results), ("sort all matches", 18)
+        )
+
+    def test_unique_and_empty(self):
+        """
+        Verify the plans of a unique search and of a search of nothing.
+        """
+        query = GMOQuery("org.storage.Pool", {"Size": 7}).require_unique_match()
+        plan = query.limit(1).explain(self.gmo)
+        self.assertTrue(plan.termination.startswith("none, every match"))
+        self.assertEqual(plan.actual_results, 1)
+
+        plan = GMOQuery("org.storage.Pool", {}).limit(1).plan({})
+        self.assertEqual(
+            (plan.estimated_visited, plan.estimated_matches, plan.estimated_results),
+            (0, 0, 0),
+        )
+        self.assertIn("comparisons: none", str(plan))
+
+    def test_selectivity(self):
+        """
+        Verify that comparisons are ordered by their selectivity in a sample
+        of the candidates, and that searches make them in that order.
+        """
+        gmo = {
+            f"/p{i}": {"org.storage.Pool": {"Name": f"p{i}", "Size": 1}}
+            for i in range(40)
+        }
+        query = GMOQuery("org.storage.Pool", {"Size": 1, "Name": "p5"})
+        self.assertEqual(query.plan({}).comparisons, ("Size", "Name"))
+        self.assertEqual(query.plan(gmo).comparisons, ("Name", "Size"))
+
+        # Only the object which passes the first comparison is checked for
+        # the property of the second.
+        for name in ("/p1", "/p7", "/p39"):
+            del gmo[name]["org.storage.Pool"]["Size"]
+        self.assertEqual([path for (path, _) in query.search(gmo)], ["/p5"])
+        self.assertEqual(query.count(GMOSnapshot(gmo)), 1)
+        self.assertTrue(query.exists(gmo))
+        self.assertEqual(query.count_by("Name", gmo), {"p5": 1})
+        self.assertEqual(query.explain(gmo).actual_matches, 1)
+
+        del gmo["/p5"]["org.storage.Pool"]["Size"]
+        with self.assertRaises(DbusClientMissingSearchPropertiesError):
+            list(query.search(gmo))
@@ -8,8 +8,9 @@ from os import sys
 from hypothesis import HealthCheck, given, settings
 from hypothesis.strategies import tuples
 
-from dbus_client_gen import managed_object_class, mo_query_builder
+from dbus_client_gen import managed_object_class, method_proxy_class, mo_query_builder
 from dbus_client_gen._errors import (
+    DbusClientArgumentError,
     DbusClientMissingInterfaceError,
     DbusClientMissingPropertyError,
     DbusClientMissingSearchPropertiesError,
@@ -17,6 +18,7 @@ from dbus_client_gen._errors import (
     DbusClientUnknownSearchPropertiesError,
 )
 from tests._introspect import interface_strategy
+from tests._transport import FakeTransport
 
 settings.register_profile("tracing", deadline=None)
 if sys.gettrace() is not None:
@@ -122,3 +124,53 @@ class TestCase(unittest.TestCase):
             else:
                 with self.assertRaises(DbusClientMissingSearchPropertiesError):
                     list(query.search({"op": {interface_name: {}}}))
+
+    @given(
+        interface_strategy(
+            max_children=3,
+            min_methods=1,
+            max_methods=3,
+            max_properties=1,
+            max_signals=1,
+            dbus_signature_args={
+                "max_codes": 3,
+                "max_complete_types": 3,
+                "max_struct_len": 3,
+            },
+        ).map(lambda x: x.element())
+    )
+    @settings(max_examples=20, suppress_health_check=[HealthCheck.too_slow])
+    def test_method_proxy(self, spec):
+        """
+        Test that the method proxy has the correct set of methods and that
+        each call carries the in arguments in signature order.
+        """
+        interface_name = spec.attrib["name"]
+        methods = {
+            method.attrib["name"]: [
+                arg
+                for arg in method.findall("./arg")
+                if arg.attrib.get("direction", "in") == "in"
+            ]
+            for method in spec.findall("./method")
+            # Exclude names which clash with attributes of the class itself
+            if not method.attrib["name"].startswith("_")
+        }
+
+        transport = FakeTransport(
+            {(interface_name, name): lambda object_path, *args: () for name in methods}
+        )
+        proxy = method_proxy_class(interface_name, spec)(transport, "/op")
+
+        for name, in_args in methods.items():
+            with self.assertRaises(DbusClientArgumentError):
+                getattr(proxy, name)(*range(len(in_args) + 1))
+
+            getattr(proxy, name)(*range(len(in_args)))
+            transport.flush()
+            (object_path, call) = transport.calls[-1]
+            self.assertEqual(object_path, "/op")
+            self.assertEqual(call.args, tuple(range(len(in_args))))
+            self.assertEqual(
+                call.signature, "".join(arg.attrib["type"] for arg in in_args)
+            )
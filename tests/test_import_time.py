@@ -0,0 +1,129 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests of the cost of importing the package.
+"""
+
+import ast
+import os
+import subprocess
+import sys
+import unittest
+
+import dbus_client_gen
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(dbus_client_gen.__file__)))
+
+
+def _run(*args):
+    """
+    Run a Python subprocess which can import the package, and return its
+    standard error and standard output.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        x for x in (_SRC_DIR, env.get("PYTHONPATH")) if x
+    )
+    process = subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+    return (process.stderr, process.stdout)
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    """
+    Test that importing the package is cheap.
+    """
+
+    def test_footprint(self):
+        """
+        Verify that importing the package imports no module but its own
+        version module. Unlike a measurement of time, this does not vary
+        with the load on the machine.
+        """
+        (_, stdout) = _run(
+            "-c",
+            "import importlib, sys; before = set(sys.modules); "
+            "import dbus_client_gen; print(' '.join(set(sys.modules) - before))",
+        )
+        self.assertEqual(
+            set(stdout.split()), {"dbus_client_gen", "dbus_client_gen._version"}
+        )
+
+    def test_first_use(self):
+        """
+        Verify that the first use of a query builder imports only the
+        submodules which queries need, and not the XML parser.
+        """
+        (_, stdout) = _run(
+            "-c",
+            "import sys; from dbus_client_gen import mo_query_builder; "
+            "print(' '.join(sorted(sys.modules)))",
+        )
+        modules = stdout.split()
+        self.assertEqual(
+            {name for name in modules if name.startswith("dbus_client_gen.")},
+            {
+                "dbus_client_gen._errors",
+                "dbus_client_gen._managed_objects_queries",
+                "dbus_client_gen._query_plan",
+                "dbus_client_gen._snapshot",
+                "dbus_client_gen._spec",
+                "dbus_client_gen._version",
+            },
+        )
+        self.assertNotIn("xml.etree.ElementTree", modules)
+
+    def test_lazy(self):
+        """
+        Verify that no submodule which defines a public name, nor the XML
+        parser, is imported until a name is accessed.
+        """
+        (_, stdout) = _run(
+            "-c",
+            "import sys; import dbus_client_gen; print(' '.join(sorted(sys.modules)))",
+        )
+        modules = stdout.split()
+        self.assertNotIn("xml.etree.ElementTree", modules)
+        self.assertNotIn("dbus_client_gen._errors", modules)
+        self.assertIn("dbus_client_gen._version", modules)
+
+    def test_names(self):
+        """
+        Verify that every public name can be accessed and is listed.
+        """
+        self.assertEqual(
+            set(dbus_client_gen.__all__), {*dbus_client_gen._LOCATIONS, "__version__"}
+        )
+        self.assertEqual(
+            len(dbus_client_gen.__all__), len(set(dbus_client_gen.__all__))
+        )
+        for name in dbus_client_gen.__all__:
+            self.assertIsNotNone(getattr(dbus_client_gen, name))
+        self.assertLessEqual(set(dbus_client_gen.__all__), set(dir(dbus_client_gen)))
+        with self.assertRaises(AttributeError):
+            dbus_client_gen.missing
+
+    def test_type_checking_imports(self):
+        """
+        Verify that the imports for type checkers import every public name
+        from the submodule which defines it.
+        """
+        with open(dbus_client_gen.__file__, encoding="utf-8") as handle:
+            tree = ast.parse(handle.read())
+        (block,) = (
+            node
+            for node in tree.body
+            if isinstance(node, ast.If)
+            and isinstance(node.test, ast.Name)
+            and node.test.id == "TYPE_CHECKING"
+        )
+        imports = {
+            node.module: tuple(alias.name for alias in node.names)
+            for node in block.body
+            if isinstance(node, ast.ImportFrom)
+        }
+        self.assertEqual(len(imports), len(block.body))
+        self.assertEqual(imports, dbus_client_gen._SUBMODULES)